@@ -1,48 +1,136 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from datetime import datetime
 import numpy as np
 import uuid
 
-from models.database import NGO, CrisisArea, Donation
-from models.types import Supply, SupplyCategory
+from models.database import NGO, CrisisArea
+from models.types import Supply, SupplyCategory, DonationStatus
 from settings import settings
+from geo import haversine_km, haversine_matrix
+from spatial import SpatialIndex
+from matching_state import DirtySets, MatchingState
+from features import (
+    CATEGORIES, REACHABILITY_RANK, NGOFeatures, AreaFeatures,
+    supply_match_scores, usable_quantity
+)
+from scoring import pair_scores, score_matrix, top_k
+from partition import SOLVERS, TASKS_PER_PROCESS, solve_partitioned
+from lots import LotIndex
+from routing import TravelCostMatrix
+from snapshot import Snapshot
+from executor import ComputeExecutor
+
+# Supported find_optimal_matches strategies
+MATCHING_STRATEGIES = tuple(SOLVERS)
 
 class AidMatchingAlgorithm:
-    def __init__(self):
-        self.distance_cache = {}  # Cache for distance calculations
+    def __init__(
+        self,
+        incremental: bool = False,
+        travel_costs: Optional[TravelCostMatrix] = None,
+        snapshot: Optional[Snapshot] = None,
+        executor: Optional[ComputeExecutor] = None
+    ):
+        # Keep scored pairs between runs and only recompute what was marked dirty
+        self.incremental = incremental
+        self.matching_state = MatchingState()
+        # Road travel costs to crisis areas with supply routes, replacing great-circle distance
+        self.travel_costs = travel_costs
+        # Columnar copy of the data; each run syncs the rows it allocates and gathers its arrays from it
+        self.snapshot = snapshot
+        # Process pool that large runs are split across by region; without one they run serially
+        self.executor = executor
         
     def calculate_distance(self, ngo: NGO, crisis_area: CrisisArea) -> float:
-        """Calculate the distance between an NGO and crisis area using Haversine formula."""
-        cache_key = (ngo.id, crisis_area.id)
-        if cache_key in self.distance_cache:
-            return self.distance_cache[cache_key]
-            
-        lat1, lon1 = ngo.latitude, ngo.longitude
-        lat2, lon2 = crisis_area.latitude, crisis_area.longitude
-        
-        R = 6371  # Earth's radius in kilometers
-        
-        dlat = np.radians(lat2 - lat1)
-        dlon = np.radians(lon2 - lon1)
-        a = (np.sin(dlat/2) * np.sin(dlat/2) +
-             np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) *
-             np.sin(dlon/2) * np.sin(dlon/2))
-        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-        distance = R * c
-        
-        self.distance_cache[cache_key] = distance
-        return distance
+        """Calculate the distance between an NGO and crisis area using Haversine formula.
+
+        Scalar reference for single pairs; matching computes distances in bulk
+        in find_reachable_pairs.
+        """
+        return haversine_km(
+            ngo.latitude, ngo.longitude,
+            crisis_area.latitude, crisis_area.longitude
+        )
+
+    def mark_ngo_dirty(self, ngo_id: str):
+        """Recompute the NGO's pairs on the next incremental match run."""
+        self.matching_state.mark_ngo_dirty(ngo_id)
+
+    def mark_crisis_area_dirty(self, area_id: str):
+        """Recompute the crisis area's pairs on the next incremental match run."""
+        self.matching_state.mark_crisis_area_dirty(area_id)
+
+    def take_dirty(self) -> DirtySets:
+        """Take the marks for a run before reading its entities; later marks wait for the next run."""
+        return self.matching_state.take_dirty()
+
+    def restore_dirty(self, dirty: DirtySets):
+        """Put back the marks of a run that failed."""
+        self.matching_state.restore_dirty(dirty)
+
+    def distance_matrix(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        dtype: str = "float64"
+    ) -> np.ndarray:
+        """Calculate distances between every NGO (rows) and crisis area (columns) in one pass.
+
+        "float32" halves the matrix's memory. Matching itself works on the
+        reachable pairs from find_reachable_pairs instead, always in float64.
+        """
+        return haversine_matrix(
+            [ngo.latitude for ngo in ngos],
+            [ngo.longitude for ngo in ngos],
+            [area.latitude for area in crisis_areas],
+            [area.longitude for area in crisis_areas],
+            dtype=dtype
+        )
+
+    def _features(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        dirty: Optional[DirtySets] = None
+    ) -> Tuple[NGOFeatures, AreaFeatures]:
+        """Dense per-category arrays for the given NGOs and crisis areas.
+
+        Rows the snapshot finds changed without a dirty mark (written by another
+        process, or straight to the database) are marked dirty, into `dirty` when
+        the run has already taken its marks, so their pairs are not carried over.
+        """
+        if self.snapshot is not None:
+            ngo_features, area_features, changed_ngos, changed_areas = self.snapshot.features(ngos, crisis_areas)
+            if self.incremental and dirty is not None:
+                dirty[0].update(changed_ngos)
+                dirty[1].update(changed_areas)
+            elif self.incremental:
+                for ngo_id in changed_ngos:
+                    self.mark_ngo_dirty(ngo_id)
+                for area_id in changed_areas:
+                    self.mark_crisis_area_dirty(area_id)
+            return ngo_features, area_features
+        return NGOFeatures.from_ngos(ngos), AreaFeatures.from_crisis_areas(crisis_areas)
+
+    def score_matrix(self, ngos: List[NGO], crisis_areas: List[CrisisArea]) -> np.ma.MaskedArray:
+        """Overall match score of every NGO (rows) for every crisis area (columns).
+
+        Pairs beyond the NGO's reach radius are masked.
+        """
+        ngo_features, area_features = self._features(ngos, crisis_areas)
+        return score_matrix(ngo_features, area_features, self.distance_matrix(ngos, crisis_areas))
 
     def calculate_supply_match_score(self, ngo: NGO, crisis_area: CrisisArea) -> Dict[SupplyCategory, float]:
         """Calculate how well an NGO's supplies match crisis area needs."""
         scores = {}
+        as_of = datetime.utcnow()
         for category, needed_amount in crisis_area.current_needs.items():
             if needed_amount == 0:
                 scores[category] = 0
                 continue
                 
             ngo_supplies = ngo.inventory.get(category, [])
-            available_amount = sum(supply.quantity for supply in ngo_supplies)
+            available_amount = usable_quantity(ngo_supplies, as_of)
             
             # Calculate match score based on:
             # 1. How much of the need can be fulfilled (0-1)
@@ -58,8 +146,154 @@ class AidMatchingAlgorithm:
             
         return scores
 
-    def find_optimal_matches(self, ngos: List[NGO], crisis_areas: List[CrisisArea]) -> List[Tuple[NGO, CrisisArea, List[Supply]]]:
-        """Find optimal matches between NGOs and crisis areas."""
+    def calculate_match_score(
+        self,
+        ngo: NGO,
+        crisis_area: CrisisArea,
+        distance: float
+    ) -> Tuple[float, Dict[SupplyCategory, float]]:
+        """Calculate the overall match score of an NGO for a crisis area within its reach."""
+        # Calculate match scores for each supply category
+        supply_scores = self.calculate_supply_match_score(ngo, crisis_area)
+        
+        # Calculate overall match score
+        distance_factor = 1 - (distance / ngo.reach_radius_km)
+        reachability_factor = 1 - (REACHABILITY_RANK[crisis_area.reachability] / 4)  # Normalized to 0-1
+        
+        overall_score = (
+            sum(supply_scores.values()) * settings.MATCHING_WEIGHT_DISTANCE +
+            distance_factor * settings.MATCHING_WEIGHT_INVENTORY +
+            reachability_factor * settings.MATCHING_WEIGHT_RESPONSE_TIME
+        ) * ngo.credibility_score  # Weight by NGO credibility
+        
+        return overall_score, supply_scores
+
+    def _supplies_to_send(
+        self,
+        ngo_features: NGOFeatures,
+        area_features: AreaFeatures,
+        lots: LotIndex,
+        row: int,
+        column: int
+    ) -> List[Supply]:
+        """Determine optimal supplies to send from an NGO (row) to a crisis area (column).
+
+        Quantities are drawn from the NGO's lots, earliest expiry first, as one
+        Supply per lot.
+        """
+        supply_scores = supply_match_scores(ngo_features, area_features, np.array([row]), np.array([column]))[0]
+        supplies_to_send = []
+        for c in np.flatnonzero(supply_scores > 0):
+            # Calculate optimal quantity considering urgency and other factors
+            optimal_quantity = min(area_features.need[column, c], ngo_features.available[row, c])
+
+            if optimal_quantity > 0:
+                supplies_to_send.extend(lots.allocate(row, CATEGORIES[c], int(optimal_quantity)))
+        return supplies_to_send
+
+    def find_reachable_pairs(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find every (NGO, crisis area) pair within the NGO's reach radius.
+
+        Returns NGO indices, crisis area indices and distances in kilometers, sorted
+        by crisis area and then by NGO. A spatial index over NGO locations keeps the
+        work proportional to the number of reachable pairs. With travel costs set,
+        crisis areas that have supply routes are reached by road instead.
+        """
+        index = SpatialIndex(
+            [ngo.latitude for ngo in ngos],
+            [ngo.longitude for ngo in ngos],
+            [ngo.reach_radius_km for ngo in ngos]
+        )
+        area_latitudes = np.array([area.latitude for area in crisis_areas], dtype=np.float64)
+        area_longitudes = np.array([area.longitude for area in crisis_areas], dtype=np.float64)
+        chunk_size = settings.MATCHING_CHUNK_SIZE
+        
+        rows, columns, distances = [], [], []
+        for start in range(0, len(crisis_areas), chunk_size):
+            block_rows, block_columns, block_distances = index.query_pairs(
+                area_latitudes[start:start + chunk_size],
+                area_longitudes[start:start + chunk_size]
+            )
+            rows.append(block_rows)
+            columns.append(start + block_columns)
+            distances.append(block_distances)
+        rows, columns, distances = np.concatenate(rows), np.concatenate(columns), np.concatenate(distances)
+        
+        if self.travel_costs is not None and self.travel_costs.routed_areas:
+            rows, columns, distances = self._apply_travel_costs(ngos, crisis_areas, rows, columns, distances)
+        return rows, columns, distances
+
+    def _apply_travel_costs(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        rows: np.ndarray,
+        columns: np.ndarray,
+        distances: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Replace great-circle distances to routed crisis areas by road travel costs.
+
+        A road is never shorter than the great circle, so the spatial index already
+        found every candidate; pairs without a road within reach are dropped.
+        """
+        routed = np.array([area.id in self.travel_costs.routed_areas for area in crisis_areas])
+        distances = distances.copy()
+        keep = np.ones(rows.size, dtype=bool)
+        for pair in np.flatnonzero(routed[columns]).tolist():
+            cost = self.travel_costs.lookup(ngos[rows[pair]].id, crisis_areas[columns[pair]].id)
+            if cost is None:
+                keep[pair] = False
+            else:
+                distances[pair] = cost
+        return rows[keep], columns[keep], distances[keep]
+
+    def find_scored_pairs(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        ngo_features: Optional[NGOFeatures] = None,
+        area_features: Optional[AreaFeatures] = None,
+        dirty: Optional[DirtySets] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Reachable pairs with their distances, scores and whether they would send supplies.
+
+        In incremental mode only pairs of NGOs and crisis areas marked dirty (or
+        not seen by the previous run) are recomputed; `dirty` is the marks taken
+        with take_dirty() before the entities were read.
+        """
+        if ngo_features is None or area_features is None:
+            ngo_features, area_features = self._features(ngos, crisis_areas, dirty)
+        state = self.matching_state if self.incremental else MatchingState()
+        return state.refresh(
+            ngos, crisis_areas, self.find_reachable_pairs,
+            lambda _ngos, _crisis_areas, rows, columns, distances: pair_scores(
+                ngo_features, area_features, rows, columns, distances
+            ),
+            dirty
+        )
+
+    def find_optimal_matches(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        strategy: str = "greedy",
+        dirty: Optional[DirtySets] = None
+    ) -> List[Tuple[NGO, CrisisArea, List[Supply]]]:
+        """Find optimal matches between NGOs and crisis areas.
+
+        The "greedy" strategy serves crisis areas in urgency order, each taking the
+        best NGO still available; "optimal" picks the one-to-one assignment with
+        the highest total match score; "split" lets several NGOs share an area's
+        needs, each sending part of its inventory. `dirty` is the marks taken with
+        take_dirty() before the NGOs and crisis areas were read.
+        """
+        if strategy not in MATCHING_STRATEGIES:
+            raise ValueError(f"Unknown matching strategy: {strategy}")
+            
         matches = []
         
         # Filter out busy NGOs
@@ -72,74 +306,140 @@ class AidMatchingAlgorithm:
             reverse=True
         )
         
-        for crisis_area in crisis_areas:
-            area_matches = []
+        if not available_ngos or not crisis_areas:
+            # Nothing was refreshed, so the marks apply to the next run
+            if dirty is not None:
+                self.restore_dirty(dirty)
+            return matches
             
-            for ngo in available_ngos:
-                # Skip if crisis area is beyond NGO's reach radius
-                distance = self.calculate_distance(ngo, crisis_area)
-                if distance > ngo.reach_radius_km:
-                    continue
-                    
-                # Calculate match scores for each supply category
-                supply_scores = self.calculate_supply_match_score(ngo, crisis_area)
-                
-                # Calculate overall match score
-                distance_factor = 1 - (distance / ngo.reach_radius_km)
-                reachability_factor = 1 - (crisis_area.reachability.value / 4)  # Normalized to 0-1
-                
-                overall_score = (
-                    sum(supply_scores.values()) * settings.MATCHING_WEIGHT_DISTANCE +
-                    distance_factor * settings.MATCHING_WEIGHT_INVENTORY +
-                    reachability_factor * settings.MATCHING_WEIGHT_RESPONSE_TIME
-                ) * ngo.credibility_score  # Weight by NGO credibility
-                
-                if overall_score > 0:
-                    area_matches.append((ngo, overall_score, supply_scores))
+        # Dense per-category arrays, shared by the whole run
+        ngo_features, area_features = self._features(available_ngos, crisis_areas, dirty)
+        rows, columns, distances, scores, sends = self.find_scored_pairs(
+            available_ngos, crisis_areas, ngo_features, area_features, dirty
+        )
+        if rows.size == 0:
+            return matches
             
-            # Sort matches by score and select the best one
-            if area_matches:
-                area_matches.sort(key=lambda x: x[1], reverse=True)
-                best_match = area_matches[0]
-                ngo, score, supply_scores = best_match
-                
-                # Determine optimal supplies to send
-                supplies_to_send = []
-                for category, score in supply_scores.items():
-                    if score > 0:
-                        needed = crisis_area.current_needs[category]
-                        available = ngo.inventory.get(category, [])
-                        
-                        # Calculate optimal quantity considering urgency and other factors
-                        optimal_quantity = min(
-                            needed,
-                            sum(s.quantity for s in available)
-                        )
-                        
-                        if optimal_quantity > 0:
-                            supplies_to_send.append(Supply(
-                                category=category,
-                                quantity=optimal_quantity,
-                                unit="units"  # This should be made dynamic based on category
-                            ))
-                
-                if supplies_to_send:
-                    matches.append((ngo, crisis_area, supplies_to_send))
-                    available_ngos.remove(ngo)  # Remove matched NGO from available pool
-                    
+        if strategy == "split":
+            flows = self._solve(strategy, len(available_ngos), {
+                "rows": rows,
+                "columns": columns,
+                "weights": self._split_weights(ngo_features, area_features, rows, columns, distances),
+                "capacity": ngo_features.available.astype(np.int64),
+                "need": area_features.need.astype(np.int64)
+            })
+            return self._split_matches(available_ngos, crisis_areas, rows, columns, flows, LotIndex(available_ngos))
+            
+        lots = LotIndex(available_ngos)  # Lots are drawn first-expired-first-out
+        selected = self._solve(strategy, len(available_ngos), {
+            "rows": rows, "columns": columns, "scores": scores, "sends": sends
+        })
+        for pair in selected.tolist():
+            row, column = int(rows[pair]), int(columns[pair])
+            supplies_to_send = self._supplies_to_send(ngo_features, area_features, lots, row, column)
+            if supplies_to_send:
+                matches.append((available_ngos[row], crisis_areas[column], supplies_to_send))
         return matches
 
-    def create_donation_records(self, matches: List[Tuple[NGO, CrisisArea, List[Supply]]]) -> List[Donation]:
-        """Create donation records from matches."""
-        donations = []
-        for ngo, crisis_area, supplies in matches:
-            donation = Donation(
-                id=str(uuid.uuid4()),
-                ngo_id=ngo.id,
-                crisis_area_id=crisis_area.id,
-                supplies=supplies,
-                timestamp=datetime.now(),
-                status=DonationStatus.PENDING
+    def find_candidates(
+        self,
+        ngos: List[NGO],
+        crisis_area: CrisisArea,
+        k: int
+    ) -> List[Tuple[NGO, float, float, List[Supply]]]:
+        """The k best available NGOs to serve one crisis area, best first.
+
+        Only NGOs that would send supplies are candidates. Each comes with its
+        match score, distance and the supplies it would send.
+        """
+        available_ngos = [ngo for ngo in ngos if not ngo.is_busy]
+        if not available_ngos:
+            return []
+        ngo_features, area_features = self._features(available_ngos, [crisis_area])
+        rows, columns, distances = self.find_reachable_pairs(available_ngos, [crisis_area])
+        scores, sends = pair_scores(ngo_features, area_features, rows, columns, distances)
+        feasible = np.flatnonzero(sends & (scores > 0))
+        best = feasible[top_k(scores[feasible], k)]
+        
+        lots = LotIndex(available_ngos)
+        return [
+            (
+                available_ngos[rows[pair]], float(scores[pair]), float(distances[pair]),
+                self._supplies_to_send(ngo_features, area_features, lots, int(rows[pair]), 0)
             )
-            donations.append(donation)
-        return donations
+            for pair in best.tolist()
+        ]
+
+    def _solve(self, strategy: str, n_ngos: int, arrays: Dict[str, np.ndarray]) -> np.ndarray:
+        """Run a strategy's solver, split by region across the executor's processes for large runs."""
+        processes = settings.MATCHING_PROCESSES
+        if (
+            self.executor is not None and processes > 1 and
+            arrays["rows"].size >= settings.MATCHING_PARALLEL_MIN_PAIRS
+        ):
+            return solve_partitioned(
+                strategy, n_ngos, arrays, processes * TASKS_PER_PROCESS, self.executor.submit_to_process
+            )
+        return SOLVERS[strategy](arrays)
+
+    def _split_weights(
+        self,
+        ngo_features: NGOFeatures,
+        area_features: AreaFeatures,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        distances: np.ndarray
+    ) -> np.ndarray:
+        """Per-unit worth of sending each category along each pair, one column per category.
+
+        A unit is worth the per-category match score of the pair, with the same
+        weights as the overall match score.
+        """
+        pair_base = (
+            (1 - distances / ngo_features.reach_radius_km[rows]) * settings.MATCHING_WEIGHT_INVENTORY +
+            area_features.reachability[columns] * settings.MATCHING_WEIGHT_RESPONSE_TIME
+        )
+        weights = (
+            area_features.urgency[columns] * ngo_features.specialization[rows] * settings.MATCHING_WEIGHT_DISTANCE +
+            pair_base[:, None]
+        )
+        weights *= ngo_features.credibility[rows, None]
+        return weights
+
+    def _split_matches(
+        self,
+        ngos: List[NGO],
+        crisis_areas: List[CrisisArea],
+        rows: np.ndarray,
+        columns: np.ndarray,
+        flows: np.ndarray,
+        lots: LotIndex
+    ) -> List[Tuple[NGO, CrisisArea, List[Supply]]]:
+        """Group the units flowing along each pair into one match per NGO and crisis area.
+
+        Pairs are sorted by crisis area, so crisis areas keep their urgency order
+        and the most urgent ones get the earliest-expiring lots.
+        """
+        matches = []
+        for pair in np.flatnonzero(flows.any(axis=1)).tolist():
+            row = int(rows[pair])
+            supplies = []
+            for c in np.flatnonzero(flows[pair]).tolist():
+                supplies.extend(lots.allocate(row, CATEGORIES[c], int(flows[pair, c])))
+            matches.append((ngos[row], crisis_areas[columns[pair]], supplies))
+        return matches
+
+    def create_donation_records(self, matches: List[Tuple[NGO, CrisisArea, List[Supply]]]) -> List[Dict]:
+        """Create donation rows from matches, ready for a bulk insert into the donations table."""
+        timestamp = datetime.utcnow()  # Naive UTC, like the column default and existing rows
+        return [
+            {
+                "id": str(uuid.uuid4()),
+                "ngo_id": ngo.id,
+                "crisis_area_id": crisis_area.id,
+                "supplies": [supply.model_dump(mode="json") for supply in supplies],
+                "timestamp": timestamp,
+                "status": DonationStatus.PENDING
+            }
+            for ngo, crisis_area, supplies in matches
+        ]
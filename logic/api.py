@@ -1,30 +1,53 @@
 from fastapi import FastAPI, HTTPException, Depends, Security, Request, WebSocket
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Iterator, Set, Tuple
 from datetime import datetime, timedelta, UTC
 import jwt as PyJWT
 from pydantic import BaseModel
 import numpy as np
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
 
-from db import get_db
-from settings import settings
-from algorithm import AidMatchingAlgorithm
+from db import get_async_db, SessionLocal, insert_donations
+from reservation import reserve_inventory
+from settings import settings, BATCH_SIZE
+from algorithm import AidMatchingAlgorithm, MATCHING_STRATEGIES
 from validation import validate_coordinates
 from models.types import (
     SupplyCategory, Location, Supply, DonationStatus,
-    NGOBase, CrisisAreaBase, DonationBase
+    NGOBase, DonationBase
 )
-from models.database import NGO, CrisisArea, Donation, User
+from models.database import NGO, CrisisArea, User
 from heatmap import HeatmapGenerator
+from scheduler import MatchScheduler
+from routing import TravelCostMatrix, compute_travel_costs, ngo_reach, area_route
+from executor import ComputeExecutor
+from snapshot import Snapshot
+from tiles import HeatmapTileCache
+from cache import HeatmapCache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(load_snapshot)
+    await asyncio.to_thread(load_travel_costs)
+    match_scheduler.start()
+    yield
+    await match_scheduler.stop()
+    compute_executor.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="NGO Inter-Coordination API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Security
@@ -45,12 +68,52 @@ app.add_middleware(
     max_age=3600,
 )
 
-# Initialize algorithm
-algorithm = AidMatchingAlgorithm()
+# CPU-heavy work runs here instead of on the event loop
+compute_executor = ComputeExecutor(threads=settings.WORKER_THREADS, processes=settings.WORKER_THREADS)
+
+# Road travel costs to crisis areas with supply routes
+travel_costs = TravelCostMatrix()
+
+# Columnar copy of NGOs and crisis areas; every write below applies its changed rows.
+# It is per process: match runs sync it from the rows they read, but /heatmap may
+# lag writes made through other worker processes until this one's next match run.
+snapshot = Snapshot()
+
+# Initialize algorithm; PATCH handlers mark what changed so /match only rescores that
+algorithm = AidMatchingAlgorithm(
+    incremental=True, travel_costs=travel_costs, snapshot=snapshot, executor=compute_executor
+)
+
+# Keeps a precomputed match plan, refreshed after updates and on a timer
+match_scheduler = MatchScheduler(
+    algorithm,
+    SessionLocal,
+    strategy=settings.MATCH_SCHEDULER_STRATEGY,
+    debounce_seconds=settings.MATCH_SCHEDULER_DEBOUNCE_SECONDS,
+    interval_seconds=settings.MATCH_SCHEDULER_INTERVAL_SECONDS,
+    executor=compute_executor,
+    timeout_seconds=settings.MATCH_TIMEOUT_SECONDS
+)
 
 # Initialize heatmap generator
 heatmap_generator = HeatmapGenerator()
 
+# /heatmap results for snapped bounds; the PATCH handlers bump its version
+heatmap_cache = HeatmapCache(
+    settings.HEATMAP_CACHE_SIZE, settings.HEATMAP_CACHE_TTL_SECONDS, settings.HEATMAP_CACHE_SNAP_DEG
+)
+
+# Heatmap tiles; a crisis area update drops only the tiles around it
+heatmap_tiles = HeatmapTileCache(settings.HEATMAP_TILE_CACHE_SIZE, heatmap_generator.radius_km)
+
+def drop_synced_heatmap_data():
+    """Drop heatmap results covering crisis areas that match runs found changed, e.g. by another worker."""
+    locations = snapshot.take_synced_area_locations()
+    if locations:
+        heatmap_cache.bump()
+        for latitude, longitude in locations:
+            heatmap_tiles.invalidate(latitude, longitude)
+
 # WebSocket connections store
 active_connections: List[WebSocket] = []
 
@@ -70,11 +133,14 @@ class Token(BaseModel):
 class NGOUpdate(BaseModel):
     is_busy: Optional[bool]
     inventory_updates: Optional[Dict[str, List[Dict]]]
+    location: Optional[Location] = None
 
 class CrisisAreaUpdate(BaseModel):
     needs_updates: Optional[Dict[str, int]]
     weather_conditions: Optional[str]
     security_level: Optional[str]
+    location: Optional[Location] = None
+    nearest_supply_routes: Optional[List[Location]] = None
 
 # Authentication
 def create_token(data: dict) -> str:
@@ -83,7 +149,7 @@ def create_token(data: dict) -> str:
     to_encode.update({"exp": expiry})
     return PyJWT.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -99,12 +165,61 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except PyJWT.JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if user is None:
         raise credentials_exception
     return user
 
 # Helper functions
+def load_snapshot():
+    """Fill the columnar snapshot from the database."""
+    db = SessionLocal()
+    try:
+        snapshot.load(db)
+    finally:
+        db.close()
+
+def load_travel_costs():
+    """Load persisted travel costs, computing them if routes exist but none were saved."""
+    db = SessionLocal()
+    try:
+        travel_costs.load(db)
+        if travel_costs.routed_areas and not len(travel_costs):
+            travel_costs.rebuild(db.query(NGO).all(), db.query(CrisisArea).all())
+            travel_costs.save(db)
+            db.commit()
+    finally:
+        db.close()
+
+async def compute(function: Callable, *args, timeout: Optional[float]):
+    """Run CPU-heavy NumPy work on the compute threads, answering 504 past the timeout."""
+    try:
+        return await compute_executor.run_in_thread(function, *args, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Computation timed out")
+
+async def recompute_travel_costs(db: AsyncSession, ngos: List[NGO], crisis_areas: List[CrisisArea]) -> Set[str]:
+    """Recompute the NGOs' road travel costs in a worker process and stage them; the caller commits.
+
+    No timeout: the change that triggered it is already committed and its
+    costs have to follow.
+    """
+    ngo_ids = {ngo.id for ngo in ngos}
+    routed_areas, costs = await compute_executor.run_in_process(
+        compute_travel_costs, [ngo_reach(ngo) for ngo in ngos], [area_route(area) for area in crisis_areas]
+    )
+    travel_costs.apply(ngo_ids, routed_areas, costs)
+    await db.run_sync(travel_costs.save, ngo_ids)
+    return ngo_ids
+
+def route_points(area: CrisisArea) -> List[tuple]:
+    """Locations whose change can alter road travel costs to a routed crisis area."""
+    if not area.nearest_supply_routes:
+        return []
+    return [(area.latitude, area.longitude)] + [
+        (point["latitude"], point["longitude"]) for point in area.nearest_supply_routes
+    ]
+
 def calculate_intensity(point_lat: float, point_lng: float, crisis_areas: List[CrisisArea], category: Optional[str] = None) -> float:
     total_intensity = 0.0
     
@@ -151,10 +266,10 @@ def calculate_intensity(point_lat: float, point_lng: float, crisis_areas: List[C
 async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        user = db.query(User).filter(User.username == form_data.username).first()
+        user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
         if not user or not user.verify_password(form_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=401,
@@ -188,59 +303,62 @@ async def get_heatmap(
     ne_lat: float,
     ne_lng: float,
     category: Optional[str] = None,
-    db: Session = Depends(get_db),
     _=Depends(get_current_user)
 ):
     """Get heatmap data for the specified bounds."""
     if not all(validate_coordinates(lat, lng) for lat, lng in [(sw_lat, sw_lng), (ne_lat, ne_lng)]):
         raise HTTPException(status_code=400, detail="Invalid coordinates")
 
-    # Get crisis areas within the bounding box with some padding
-    padding = settings.HEATMAP_RADIUS_KM / 111  # Convert km to degrees (approximate)
-    crisis_areas = db.query(CrisisArea).filter(
-        CrisisArea.latitude >= sw_lat - padding,
-        CrisisArea.latitude <= ne_lat + padding,
-        CrisisArea.longitude >= sw_lng - padding,
-        CrisisArea.longitude <= ne_lng + padding
-    ).all()
-
-    # Convert to domain models
-    crisis_areas = [
-        CrisisAreaBase(
-            id=area.id,
-            name=area.name,
-            location=Location(latitude=area.latitude, longitude=area.longitude),
-            current_needs=area.current_needs,
-            reachability=area.reachability,
-            weather_conditions=area.weather_conditions,
-            urgency_levels=area.urgency_levels,
-            population=area.population,
-            current_inventory=area.current_inventory,
-            road_conditions=area.road_conditions,
-            security_level=area.security_level,
-            nearest_supply_routes=[
-                Location(**route) for route in area.nearest_supply_routes
-            ]
-        )
-        for area in crisis_areas
-    ]
+    drop_synced_heatmap_data()
 
-    # Generate heatmap data
-    bounds = (
+    # Generate heatmap data for the bounds snapped to the cache grid
+    bounds = heatmap_cache.snap((
         Location(latitude=sw_lat, longitude=sw_lng),
         Location(latitude=ne_lat, longitude=ne_lng)
-    )
+    ))
     
     selected_category = SupplyCategory(category) if category else None
-    return heatmap_generator.generate_heatmap_data(crisis_areas, bounds, selected_category)
+    key = heatmap_cache.key(bounds, selected_category, heatmap_cache.version)
+    data = heatmap_cache.get(key)
+    if data is None:
+        data = await compute(
+            heatmap_generator.generate_heatmap_data, snapshot, bounds, selected_category,
+            timeout=settings.HEATMAP_TIMEOUT_SECONDS
+        )
+        heatmap_cache.set(key, data)
+    return data
+
+@app.get("/heatmap/tiles/{z}/{x}/{y}")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    category: Optional[str] = None,
+    _=Depends(get_current_user)
+):
+    """Get heatmap data for a slippy-map tile, served from the tile cache when current."""
+    if not 0 <= z <= settings.HEATMAP_TILE_MAX_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise HTTPException(status_code=400, detail="Invalid tile")
+    
+    drop_synced_heatmap_data()
+    selected_category = SupplyCategory(category) if category else None
+    tile = heatmap_tiles.get(z, x, y, selected_category)
+    if tile is None:
+        generation = heatmap_tiles.generation
+        tile = await compute(
+            heatmap_generator.generate_tile_data, snapshot, z, x, y, selected_category,
+            timeout=settings.HEATMAP_TIMEOUT_SECONDS
+        )
+        heatmap_tiles.set(z, x, y, selected_category, tile, generation)
+    return tile
 
 @app.get("/crisis-areas")
 async def get_crisis_areas(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(get_current_user)
 ) -> List[Dict]:
     """Get all crisis areas."""
-    crisis_areas = db.query(CrisisArea).all()
+    crisis_areas = (await db.execute(select(CrisisArea))).scalars().all()
     return [{
         "id": area.id,
         "name": area.name,
@@ -259,11 +377,11 @@ async def get_crisis_areas(
 
 @app.get("/ngos")
 async def get_ngos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(get_current_user)
 ) -> List[Dict]:
     """Get all NGOs."""
-    ngos = db.query(NGO).all()
+    ngos = (await db.execute(select(NGO))).scalars().all()
     return [{
         "id": ngo.id,
         "name": ngo.name,
@@ -280,58 +398,177 @@ async def get_ngos(
         "specializations": ngo.specializations
     } for ngo in ngos]
 
+def match_record(
+    ngo: NGO,
+    area: CrisisArea,
+    supplies: List[Supply],
+    donation: Optional[Dict] = None
+) -> Dict:
+    """JSON-ready description of a match, with its donation once committed."""
+    record = {
+        "ngo": ngo.name,
+        "crisis_area": area.name,
+        "supplies": [
+            {
+                "category": s.category.value,
+                "quantity": s.quantity,
+                "unit": s.unit,
+                "expiry_date": s.expiry_date.isoformat() if s.expiry_date else None
+            }
+            for s in supplies
+        ]
+    }
+    if donation is not None:
+        record["donation_id"] = donation["id"]
+    return record
+
+def commit_matches(db: Session, matches: List) -> Tuple[List, List[Dict]]:
+    """Reserve inventory for the matches and save their donations in one transaction.
+
+    Matches whose NGO is locked by a concurrent commit or can no longer cover
+    them are left out. Returns the committed matches and their donation rows.
+    """
+    reserved = reserve_inventory(db, matches)
+    matches = [matches[position] for position in reserved]
+    donations = algorithm.create_donation_records(matches)
+    insert_donations(db, donations)
+    db.commit()
+    
+    # Reserved inventory changes these NGOs' scores
+    ngo_ids = {ngo.id for ngo, _, _ in matches}
+    if ngo_ids:
+        snapshot.update_ngos(db.query(NGO).filter(NGO.id.in_(ngo_ids)).all())
+    for ngo_id in ngo_ids:
+        algorithm.mark_ngo_dirty(ngo_id)
+    match_scheduler.trigger()  # Prepare the next plan from the committed state
+    return matches, donations
+
+def stream_matches(matches: List) -> Iterator[str]:
+    """Commit matches in batches, yielding one NDJSON line per match once its batch is committed."""
+    # The request's session is closed before the response body is sent
+    db = SessionLocal()
+    try:
+        for start in range(0, len(matches), BATCH_SIZE):
+            batch, donations = commit_matches(db, matches[start:start + BATCH_SIZE])
+            for (ngo, area, supplies), donation in zip(batch, donations):
+                yield json.dumps(match_record(ngo, area, supplies, donation)) + "\n"
+    finally:
+        db.close()
+
 @app.post("/match")
 async def find_matches(
-    db: Session = Depends(get_db),
+    strategy: str = "greedy",
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(get_current_user)
 ) -> List[Dict]:
-    """Find optimal matches between NGOs and crisis areas."""
-    ngos = db.query(NGO).filter(NGO.is_busy == False).all()
-    crisis_areas = db.query(CrisisArea).all()
+    """Commit the current match plan between NGOs and crisis areas.
+
+    The background plan is used when it is up to date; otherwise a fresh one is
+    computed first. With stream=true, matches are returned as newline-delimited
+    JSON, each record sent as soon as its donation is committed.
+    """
+    if strategy not in MATCHING_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown matching strategy: {strategy}")
     
-    matches = algorithm.find_optimal_matches(ngos, crisis_areas)
-    donations = algorithm.create_donation_records(matches)
+    try:
+        plan = await match_scheduler.take_plan(strategy)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Match plan computation timed out")
+    matches = plan.matches
     
-    # Save donations to database
-    for donation in donations:
-        db_donation = Donation(
-            id=donation.id,
-            ngo_id=donation.ngo_id,
-            crisis_area_id=donation.crisis_area_id,
-            supplies=donation.supplies,
-            status=donation.status
-        )
-        db.add(db_donation)
+    if stream:
+        if not matches:
+            match_scheduler.trigger()  # Nothing to commit; prepare the next plan
+        return StreamingResponse(stream_matches(matches), media_type="application/x-ndjson")
     
-    db.commit()
+    matches, donations = await db.run_sync(commit_matches, matches)
     
     return [
-        {
-            "ngo": ngo.name,
-            "crisis_area": area.name,
-            "supplies": [
-                {
-                    "category": s.category.value,
-                    "quantity": s.quantity,
-                    "unit": s.unit
-                }
-                for s in supplies
-            ],
-            "donation_id": donation.id
-        }
+        match_record(ngo, area, supplies, donation)
         for (ngo, area, supplies), donation 
         in zip(matches, donations)
     ]
 
+@app.get("/match/plan")
+async def get_match_plan(_=Depends(get_current_user)) -> Dict:
+    """Get the latest background match plan without committing it."""
+    plan = match_scheduler.plan
+    return {
+        "version": plan.version if plan else None,
+        "strategy": match_scheduler.strategy,
+        "computed_at": plan.computed_at.isoformat() if plan else None,
+        "pending": match_scheduler.pending,
+        "matches": [
+            match_record(ngo, area, supplies)
+            for ngo, area, supplies in (plan.matches if plan else [])
+        ]
+    }
+
+@app.get("/crisis-areas/{area_id}/candidates")
+async def get_area_candidates(
+    area_id: str,
+    k: int = settings.MATCH_CANDIDATES_K,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(get_current_user)
+) -> List[Dict]:
+    """Get the k best available NGOs for a crisis area, best first, without committing anything."""
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    area = await db.get(CrisisArea, area_id)
+    if not area:
+        raise HTTPException(status_code=404, detail="Crisis area not found")
+    
+    ngos = (await db.execute(select(NGO).where(NGO.is_busy == False))).scalars().all()
+    candidates = await compute(algorithm.find_candidates, ngos, area, k, timeout=settings.MATCH_TIMEOUT_SECONDS)
+    return [
+        {
+            **match_record(ngo, area, supplies),
+            "ngo_id": ngo.id,
+            "score": score,
+            "distance_km": distance
+        }
+        for ngo, score, distance, supplies in candidates
+    ]
+
+@app.get("/stats")
+async def get_stats(_=Depends(get_current_user)) -> Dict:
+    """Get in-process cache statistics for this worker."""
+    return {
+        "matching_state": {
+            "pairs": len(algorithm.matching_state),
+            "recomputed_pairs": algorithm.matching_state.recomputed_pairs,
+            "version": algorithm.matching_state.version
+        },
+        "snapshot": {
+            "ngos": len(snapshot.ngos),
+            "crisis_areas": len(snapshot.areas),
+            "version": snapshot.version
+        },
+        "travel_costs": {
+            "pairs": len(travel_costs),
+            "routed_areas": len(travel_costs.routed_areas),
+            "version": travel_costs.version
+        },
+        "heatmap_cache": heatmap_cache.stats(),
+        "heatmap_tiles": heatmap_tiles.stats(),
+        "compute": compute_executor.stats(),
+        "match_scheduler": {
+            "plan_version": match_scheduler.plan.version if match_scheduler.plan else None,
+            "computed_plans": match_scheduler.version,
+            "pending": match_scheduler.pending
+        }
+    }
+
 @app.patch("/ngos/{ngo_id}")
 async def update_ngo(
     ngo_id: str,
     updates: NGOUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(get_current_user)
 ):
     """Update NGO status and inventory."""
-    ngo = db.query(NGO).filter(NGO.id == ngo_id).first()
+    ngo = await db.get(NGO, ngo_id)
     if not ngo:
         raise HTTPException(status_code=404, detail="NGO not found")
         
@@ -343,7 +580,25 @@ async def update_ngo(
             if category in SupplyCategory.__members__:
                 ngo.inventory[category] = supplies
                 
-    db.commit()
+    if updates.location:
+        if not validate_coordinates(updates.location.latitude, updates.location.longitude):
+            raise HTTPException(status_code=400, detail="Invalid coordinates")
+        ngo.latitude = updates.location.latitude
+        ngo.longitude = updates.location.longitude
+                
+    await db.commit()
+    await db.refresh(ngo)  # Read back the committed row
+    snapshot.update_ngos([ngo])
+    heatmap_cache.bump()
+    
+    if updates.location and travel_costs.routed_areas:
+        # Road travel costs start from the NGO's new location
+        crisis_areas = (await db.execute(select(CrisisArea))).scalars().all()
+        await recompute_travel_costs(db, [ngo], crisis_areas)
+        await db.commit()
+    
+    algorithm.mark_ngo_dirty(ngo_id)  # Also finds the pairs in reach of a new location
+    match_scheduler.trigger()
     
     # Notify connected clients of the update
     await notify_clients({
@@ -359,13 +614,15 @@ async def update_ngo(
 async def update_crisis_area(
     area_id: str,
     updates: CrisisAreaUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(get_current_user)
 ):
     """Update crisis area needs and conditions."""
-    area = db.query(CrisisArea).filter(CrisisArea.id == area_id).first()
+    area = await db.get(CrisisArea, area_id)
     if not area:
         raise HTTPException(status_code=404, detail="Crisis area not found")
+    previous_route_points = route_points(area)
+    previous_location = (area.latitude, area.longitude)
         
     if updates.needs_updates:
         for category, amount in updates.needs_updates.items():
@@ -378,7 +635,40 @@ async def update_crisis_area(
     if updates.security_level:
         area.security_level = updates.security_level
         
-    db.commit()
+    if updates.location:
+        if not validate_coordinates(updates.location.latitude, updates.location.longitude):
+            raise HTTPException(status_code=400, detail="Invalid coordinates")
+        area.latitude = updates.location.latitude
+        area.longitude = updates.location.longitude
+        
+    if updates.nearest_supply_routes is not None:
+        if not all(validate_coordinates(point.latitude, point.longitude) for point in updates.nearest_supply_routes):
+            raise HTTPException(status_code=400, detail="Invalid coordinates")
+        area.nearest_supply_routes = [point.model_dump() for point in updates.nearest_supply_routes]
+        
+    await db.commit()
+    await db.refresh(area)  # Read back the committed row
+    snapshot.update_crisis_areas([area])
+    heatmap_cache.bump()
+    if updates.needs_updates or updates.location:
+        # Tiles around the old and new location show this area's satisfaction
+        for latitude, longitude in {previous_location, (area.latitude, area.longitude)}:
+            heatmap_tiles.invalidate(latitude, longitude)
+    
+    changed_route_points = previous_route_points + route_points(area)
+    if changed_route_points and (updates.location or updates.nearest_supply_routes is not None):
+        # Only NGOs that can reach the old or new route are recomputed
+        ngos = (await db.execute(select(NGO))).scalars().all()
+        crisis_areas = (await db.execute(select(CrisisArea))).scalars().all()
+        affected_ngos = await recompute_travel_costs(
+            db, travel_costs.affected_ngos(ngos, changed_route_points), crisis_areas
+        )
+        await db.commit()
+        for ngo_id in affected_ngos:
+            algorithm.mark_ngo_dirty(ngo_id)
+    
+    algorithm.mark_crisis_area_dirty(area_id)
+    match_scheduler.trigger()
     
     # Notify connected clients of the update
     await notify_clients({
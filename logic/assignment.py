@@ -0,0 +1,170 @@
+from typing import List, Optional
+import numpy as np
+
+# Below this many simultaneous bidders a plain Python loop beats NumPy call overhead
+SEQUENTIAL_BIDDERS = 64
+
+def _segment_argmax(values: np.ndarray, segment_ids: np.ndarray, segment_starts: np.ndarray):
+    """Max, position of the first max and second max of each contiguous, non-empty segment."""
+    best = np.maximum.reduceat(values, segment_starts)
+    candidates = np.flatnonzero(values == best[segment_ids])
+    _, first = np.unique(segment_ids[candidates], return_index=True)
+    best_position = candidates[first]
+
+    values = values.copy()
+    values[best_position] = -np.inf
+    second = np.maximum.reduceat(values, segment_starts)
+    return best, best_position, second
+
+def _sequential_bidding(
+    bidders: List[int],
+    indptr: List[int],
+    cols: List[int],
+    benefits: List[float],
+    prices: np.ndarray,
+    owner: np.ndarray,
+    assignment: np.ndarray,
+    epsilon: float,
+    span: float
+):
+    """Gauss-Seidel auction rounds, one bidder at a time, until every row is assigned."""
+    price = prices.tolist()
+    owned_by = owner.tolist()
+    assigned = assignment.tolist()
+    while bidders:
+        row = bidders.pop()
+        best = second = -np.inf
+        target = -1
+        for edge in range(indptr[row], indptr[row + 1]):
+            value = benefits[edge] - price[cols[edge]]
+            if value > best:
+                best, second, target = value, best, cols[edge]
+            elif value > second:
+                second = value
+        price[target] += min(best - second, span) + epsilon
+        previous = owned_by[target]
+        owned_by[target] = row
+        assigned[row] = target
+        if previous >= 0:
+            assigned[previous] = -1
+            bidders.append(previous)
+    prices[:] = price
+    owner[:] = owned_by
+    assignment[:] = assigned
+
+def _auction(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    benefits: np.ndarray,
+    n: int,
+    final_epsilon: float,
+    scaling: float
+) -> np.ndarray:
+    """Auction algorithm with epsilon scaling for a square problem that has a perfect matching."""
+    # Group edges by row (CSR layout)
+    order = np.argsort(rows, kind="stable")
+    rows, cols, benefits = rows[order], cols[order], benefits[order]
+    counts = np.bincount(rows, minlength=n)
+    indptr = np.concatenate(([0], np.cumsum(counts)))
+    indptr_list, cols_list, benefits_list = indptr.tolist(), cols.tolist(), benefits.tolist()
+
+    span = float(benefits.max() - benefits.min())
+    current_epsilon = max(span / 4, final_epsilon)
+    prices = np.zeros(n)
+    assignment = np.full(n, -1, dtype=np.int64)
+
+    while True:
+        assignment.fill(-1)
+        owner = np.full(n, -1, dtype=np.int64)
+        bidders = np.arange(n)
+
+        while bidders.size:
+            if bidders.size <= SEQUENTIAL_BIDDERS:
+                _sequential_bidding(
+                    bidders.tolist(), indptr_list, cols_list, benefits_list,
+                    prices, owner, assignment, current_epsilon, span
+                )
+                break
+
+            # Gather the edges of every bidder as one flat array of segments
+            lengths = counts[bidders]
+            segment_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            segment_ids = np.repeat(np.arange(bidders.size), lengths)
+            edges = np.arange(lengths.sum()) - np.repeat(segment_starts, lengths) + np.repeat(indptr[bidders], lengths)
+            values = benefits[edges] - prices[cols[edges]]
+
+            best, best_position, second = _segment_argmax(values, segment_ids, segment_starts)
+            targets = cols[edges[best_position]]
+            # Bid up to the point where the second best option becomes as attractive
+            bids = prices[targets] + np.minimum(best - second, span) + current_epsilon
+
+            # The highest bid wins each column
+            order = np.lexsort((-bids, targets))
+            targets, bids, bidders = targets[order], bids[order], bidders[order]
+            first = np.concatenate(([True], targets[1:] != targets[:-1]))
+            won_cols, won_bids, winners = targets[first], bids[first], bidders[first]
+
+            displaced = owner[won_cols]
+            displaced = displaced[displaced >= 0]
+            assignment[displaced] = -1
+            owner[won_cols] = winners
+            assignment[winners] = won_cols
+            prices[won_cols] = won_bids
+
+            bidders = np.concatenate((bidders[~first], displaced))
+
+        if current_epsilon <= final_epsilon:
+            return assignment
+        current_epsilon = max(current_epsilon * scaling, final_epsilon)
+
+def auction_assignment(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    benefits: np.ndarray,
+    n_rows: int,
+    n_cols: int,
+    epsilon: Optional[float] = None,
+    scaling: float = 0.2
+) -> np.ndarray:
+    """Maximum-weight bipartite matching over sparse (row, col, benefit) edges.
+
+    Solved with Bertsekas' auction algorithm with epsilon scaling, using
+    simultaneous (Jacobi) bidding so every round is a handful of NumPy
+    operations over the bidders' edges. Only positive benefits are matched and
+    rows or columns may stay unassigned; the total benefit is within
+    `(n_rows + n_cols) * epsilon` of the optimum.
+
+    Returns the assigned column of every row, or -1 for unassigned rows.
+    """
+    assignment = np.full(n_rows, -1, dtype=np.int64)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    benefits = np.asarray(benefits, dtype=np.float64)
+
+    positive = benefits > 0
+    rows, cols, benefits = rows[positive], cols[positive], benefits[positive]
+    if rows.size == 0:
+        return assignment
+
+    # Only rows and columns with at least one edge take part
+    row_ids, rows = np.unique(rows, return_inverse=True)
+    col_ids, cols = np.unique(cols, return_inverse=True)
+    n, m = row_ids.size, col_ids.size
+
+    # Square problem with a guaranteed perfect matching: row i may take its own
+    # dummy column m + i, column j may be taken by its own dummy row n + j, and
+    # dummy row n + j may take the dummy column of any row adjacent to column j.
+    # All dummy edges are worth 0, so unmatched entities cost nothing.
+    zeros = np.zeros(rows.size)
+    square_rows = np.concatenate((rows, np.arange(n), n + np.arange(m), n + cols))
+    square_cols = np.concatenate((cols, m + np.arange(n), np.arange(m), m + rows))
+    square_benefits = np.concatenate((benefits, np.zeros(n), np.zeros(m), zeros))
+
+    if epsilon is None:
+        epsilon = float(benefits.max()) / (10 * (n + m))
+    square_assignment = _auction(square_rows, square_cols, square_benefits, n + m, epsilon, scaling)
+
+    matched = square_assignment[:n]
+    real = matched < m
+    assignment[row_ids[real]] = col_ids[matched[real]]
+    return assignment
@@ -0,0 +1,47 @@
+"""Compare greedy and optimal matching strategies on synthetic instances.
+
+Run from the logic directory: python -m benchmarks.assignment --sizes 1000 10000 50000
+"""
+from typing import Dict, List
+import argparse
+import json
+import time
+
+from algorithm import AidMatchingAlgorithm
+from benchmarks.synthetic import generate_instance
+
+def total_score(algorithm: AidMatchingAlgorithm, matches) -> float:
+    return sum(
+        algorithm.calculate_match_score(ngo, area, algorithm.calculate_distance(ngo, area))[0]
+        for ngo, area, _ in matches
+    )
+
+def run(sizes: List[int], ngo_share: float, seed: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        n_ngos = max(1, int(size * ngo_share))
+        ngos, crisis_areas = generate_instance(n_ngos, size - n_ngos, seed=seed)
+        for strategy in ("greedy", "optimal"):
+            algorithm = AidMatchingAlgorithm()
+            started = time.perf_counter()
+            matches = algorithm.find_optimal_matches(ngos, crisis_areas, strategy=strategy)
+            elapsed = time.perf_counter() - started
+            results.append({
+                "entities": size,
+                "ngos": n_ngos,
+                "crisis_areas": size - n_ngos,
+                "strategy": strategy,
+                "seconds": round(elapsed, 4),
+                "matches": len(matches),
+                "total_score": round(total_score(algorithm, matches), 4)
+            })
+            print(json.dumps(results[-1]))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--ngo-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.ngo_share, args.seed)
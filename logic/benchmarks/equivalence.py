@@ -0,0 +1,96 @@
+"""Check the vectorized scoring kernels against the per-pair reference scoring.
+
+The columnar snapshot's arrays are also checked against the features and
+heatmap satisfaction levels computed from the ORM objects.
+
+Run from the logic directory: python -m benchmarks.equivalence --ngos 300 --crisis-areas 1200
+Exits with status 1 if any pair's score differs beyond the tolerance.
+"""
+import argparse
+import json
+import sys
+from dataclasses import fields
+import numpy as np
+
+from algorithm import AidMatchingAlgorithm
+from features import CATEGORIES, NGOFeatures, AreaFeatures
+from scoring import pair_scores
+from snapshot import Snapshot
+from heatmap import HeatmapGenerator
+from models.types import Supply
+from benchmarks.synthetic import generate_instance
+
+def check(n_ngos: int, n_crisis_areas: int, seed: int, tolerance: float) -> bool:
+    ngos, crisis_areas = generate_instance(n_ngos, n_crisis_areas, seed=seed)
+    # Include zero needs, which the reference scores as 0 rather than dividing
+    for area in crisis_areas[::7]:
+        area.current_needs = {category: 0 for category in area.current_needs}
+
+    algorithm = AidMatchingAlgorithm()
+    rows, columns, distances = algorithm.find_reachable_pairs(ngos, crisis_areas)
+    reference_scores = np.zeros(rows.size)
+    reference_sends = np.zeros(rows.size, dtype=bool)
+    for pair, (row, column, distance) in enumerate(zip(rows.tolist(), columns.tolist(), distances.tolist())):
+        overall_score, supply_scores = algorithm.calculate_match_score(ngos[row], crisis_areas[column], distance)
+        reference_scores[pair] = overall_score
+        reference_sends[pair] = any(score > 0 for score in supply_scores.values())
+
+    scores, sends = pair_scores(
+        NGOFeatures.from_ngos(ngos), AreaFeatures.from_crisis_areas(crisis_areas), rows, columns, distances
+    )
+    matrix = algorithm.score_matrix(ngos, crisis_areas)
+    in_reach = ~np.ma.getmaskarray(matrix)
+    expected_reach = np.zeros(matrix.shape, dtype=bool)
+    expected_reach[rows, columns] = True
+
+    result = {
+        "pairs": int(rows.size),
+        "pair_max_error": float(np.abs(scores - reference_scores).max(initial=0.0)),
+        "pair_sends_equal": bool(np.array_equal(sends, reference_sends)),
+        "matrix_max_error": float(np.abs(matrix.data[rows, columns] - reference_scores).max(initial=0.0)),
+        "matrix_mask_equal": bool(np.array_equal(in_reach, expected_reach))
+    }
+    result.update(check_snapshot(ngos, crisis_areas))
+    print(json.dumps(result))
+    return (
+        result["pair_max_error"] <= tolerance and result["pair_sends_equal"] and
+        result["matrix_max_error"] <= tolerance and result["matrix_mask_equal"] and
+        result["snapshot_features_equal"] and result["snapshot_satisfaction_max_error"] <= tolerance
+    )
+
+def check_snapshot(ngos: list, crisis_areas: list) -> dict:
+    # Partly supplied areas, so satisfaction levels vary
+    for area in crisis_areas[::3]:
+        area.current_inventory = {
+            category: [Supply(category=category, quantity=need // 2, unit="units")]
+            for category, need in area.current_needs.items()
+        }
+    snapshot = Snapshot()
+    snapshot.rebuild(ngos, crisis_areas)
+
+    pairs = [
+        (snapshot.ngo_features(ngos), NGOFeatures.from_ngos(ngos)),
+        (snapshot.area_features(crisis_areas), AreaFeatures.from_crisis_areas(crisis_areas))
+    ]
+    features_equal = all(
+        np.array_equal(getattr(actual, field.name), getattr(expected, field.name))
+        for actual, expected in pairs for field in fields(expected)
+    )
+
+    heatmap = HeatmapGenerator()
+    rows = np.arange(len(crisis_areas))
+    satisfaction_error = 0.0
+    for category in [None] + CATEGORIES:
+        expected = np.array([heatmap._calculate_satisfaction_level(area, category) for area in crisis_areas])
+        for actual in (snapshot.satisfaction(rows, category), snapshot.area_satisfaction(category)):
+            satisfaction_error = max(satisfaction_error, float(np.abs(actual - expected).max()))
+    return {"snapshot_features_equal": features_equal, "snapshot_satisfaction_max_error": satisfaction_error}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ngos", type=int, default=300)
+    parser.add_argument("--crisis-areas", type=int, default=1200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+    sys.exit(0 if check(args.ngos, args.crisis_areas, args.seed, args.tolerance) else 1)
@@ -0,0 +1,155 @@
+"""Time heatmap generation on a dense synthetic region and check it against a per-point reference.
+
+Run from the logic directory: python -m benchmarks.heatmap --crisis-areas 20000 --sizes-deg 0.1 0.25 0.5 2.0
+Every view is generated in each mode (dense mode only up to --dense-max-deg)
+and stencil results are compared with dense ones. The reference check runs on
+the smallest view only, since it loops over every grid point and crisis area
+in Python. Exits with status 1 on a mismatch.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import platform
+import sys
+import numpy as np
+
+from geo import haversine_km, reach_deg
+from heatmap import HeatmapGenerator
+from snapshot import Snapshot
+from models.types import Location, Supply, SupplyCategory
+from benchmarks.synthetic import generate_instance
+from benchmarks.matching import measure, current_commit
+
+def reference_points(
+    generator: HeatmapGenerator,
+    crisis_areas: list,
+    bounds: Tuple[Location, Location],
+    category: Optional[SupplyCategory]
+) -> List[Tuple[float, float, float, float]]:
+    """(lat, lng, intensity, satisfaction) of every heatmap point, one grid point and crisis area at a time."""
+    sw, ne = bounds
+    nearby = []
+    for area in crisis_areas:
+        lat_reach, lon_reach = reach_deg(area.latitude, generator.radius_km)
+        if (
+            sw.latitude - lat_reach <= area.latitude <= ne.latitude + lat_reach
+            and sw.longitude - lon_reach <= area.longitude <= ne.longitude + lon_reach
+        ):
+            nearby.append(area)
+    lat_vals, lon_vals = generator.grid_axes(bounds)
+    points = []
+    for lat in lat_vals.tolist():
+        for lng in lon_vals.tolist():
+            max_intensity = weighted_satisfaction = total_weight = 0.0
+            for area in nearby:
+                distance = haversine_km(lat, lng, area.latitude, area.longitude)
+                if distance > generator.radius_km:
+                    continue
+                weight = (1 - distance / generator.radius_km) ** 2
+                weighted_satisfaction += generator._calculate_satisfaction_level(area, category) * weight
+                total_weight += weight
+                urgency = max(area.urgency_levels.values()) if area.urgency_levels else 1
+                max_intensity = max(max_intensity, urgency * weight)
+            if total_weight > 0 and max_intensity > 0:
+                points.append((lat, lng, max_intensity, weighted_satisfaction / total_weight))
+    return points
+
+def compare(points: List[Dict], reference: List[Tuple[float, float, float, float]]) -> float:
+    """Largest difference between matching points, or infinity if they are not the same points."""
+    if len(points) != len(reference):
+        return float("inf")
+    actual = np.array([[p["lat"], p["lng"], p["intensity"], p["satisfaction"]] for p in points]).reshape(-1, 4)
+    return float(np.abs(actual - np.array(reference).reshape(-1, 4)).max(initial=0.0))
+
+def run(
+    n_crisis_areas: int,
+    spread_deg: float,
+    sizes_deg: List[float],
+    category: Optional[SupplyCategory],
+    modes: List[str],
+    dense_max_deg: float,
+    repeat: int,
+    seed: int,
+    tolerance: float
+) -> Tuple[List[Dict], bool]:
+    _, crisis_areas = generate_instance(0, n_crisis_areas, seed=seed, n_regions=1, region_spread_deg=spread_deg)
+    # Partly supplied areas, so satisfaction levels vary
+    for area in crisis_areas[::3]:
+        area.current_inventory = {
+            category: [Supply(category=category, quantity=need // 2, unit="units")]
+            for category, need in area.current_needs.items()
+        }
+    snapshot = Snapshot()
+    snapshot.rebuild([], crisis_areas)
+    generator = HeatmapGenerator()
+    center_lat = float(np.median(snapshot.areas["latitude"]))
+    center_lng = float(np.median(snapshot.areas["longitude"]))
+
+    results, passed = [], True
+    for size in sorted(sizes_deg):
+        bounds = (
+            Location(latitude=center_lat - size / 2, longitude=center_lng - size / 2),
+            Location(latitude=center_lat + size / 2, longitude=center_lng + size / 2)
+        )
+        lat_vals, lon_vals = generator.grid_axes(bounds)
+        reference = None
+        if size == min(sizes_deg):
+            reference = reference_points(generator, crisis_areas, bounds, category)
+        points = {}
+        for mode in modes:
+            if mode == "dense" and size > dense_max_deg:
+                continue
+            generator.mode = mode
+            points[mode] = generator.generate_heatmap_data(snapshot, bounds, category)["points"]
+            result = {
+                "size_deg": size,
+                "mode": mode,
+                "grid_points": lat_vals.size * lon_vals.size,
+                "crisis_areas_in_view": int(snapshot.areas_within(
+                    bounds[0].latitude, bounds[0].longitude, bounds[1].latitude, bounds[1].longitude
+                ).size),
+                "heatmap_points": len(points[mode]),
+                **measure(lambda: generator.generate_heatmap_data(snapshot, bounds, category), repeat)
+            }
+            if reference is not None:
+                result["reference_max_error"] = compare(points[mode], reference)
+                passed = passed and result["reference_max_error"] <= tolerance
+            if mode != "dense" and "dense" in points:
+                result["dense_max_error"] = compare(
+                    points[mode], [(p["lat"], p["lng"], p["intensity"], p["satisfaction"]) for p in points["dense"]]
+                )
+                passed = passed and result["dense_max_error"] <= tolerance
+            results.append(result)
+            print(json.dumps(result))
+    return results, passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--crisis-areas", type=int, default=20000)
+    parser.add_argument("--spread-deg", type=float, default=1.0, help="Spread of the crisis areas around the region center")
+    parser.add_argument("--sizes-deg", type=float, nargs="+", default=[0.1, 0.25, 0.5, 2.0], help="Side lengths of the square views")
+    parser.add_argument("--modes", nargs="+", choices=["dense", "stencil"], default=["dense", "stencil"])
+    parser.add_argument("--dense-max-deg", type=float, default=0.5, help="Larger views are run in stencil mode only")
+    parser.add_argument("--category", choices=[category.value for category in SupplyCategory])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--output", default="heatmap_results.json")
+    args = parser.parse_args()
+
+    category = SupplyCategory(args.category) if args.category else None
+    results, passed = run(
+        args.crisis_areas, args.spread_deg, args.sizes_deg, category,
+        args.modes, args.dense_max_deg, args.repeat, args.seed, args.tolerance
+    )
+    with open(args.output, "w") as output:
+        json.dump({
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "crisis_areas": args.crisis_areas,
+            "category": args.category,
+            "results": results
+        }, output, indent=2)
+    sys.exit(0 if passed else 1)
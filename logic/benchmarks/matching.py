@@ -0,0 +1,142 @@
+"""Time and measure the matching pipeline on seeded synthetic instances.
+
+Run from the logic directory: python -m benchmarks.matching --sizes 1000 10000 100000 --output results.json
+Each benchmark is timed in a plain run, then repeated under tracemalloc for its
+peak memory. The JSON output carries the commit so runs can be compared.
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+
+from algorithm import AidMatchingAlgorithm
+from executor import ComputeExecutor
+from partition import split_flows
+from settings import settings
+from benchmarks.synthetic import generate_instance
+
+def measure(function: Callable, repeat: int) -> Dict:
+    """Best wall time over `repeat` runs, then peak traced memory of one more run."""
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(seconds), 4), "peak_memory_mb": round(peak / 2**20, 2)}
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(
+    sizes: List[int],
+    ngo_share: float,
+    strategies: List[str],
+    score_pairs: int,
+    repeat: int,
+    seed: int,
+    executor: Optional[ComputeExecutor] = None
+) -> List[Dict]:
+    results = []
+
+    def record(size: int, n_ngos: int, benchmark: str, measured: Dict, **extra):
+        results.append({
+            "entities": size,
+            "ngos": n_ngos,
+            "crisis_areas": size - n_ngos,
+            "benchmark": benchmark,
+            **measured,
+            **extra
+        })
+        print(json.dumps(results[-1]))
+
+    for size in sizes:
+        n_ngos = max(1, int(size * ngo_share))
+        ngos, crisis_areas = generate_instance(n_ngos, size - n_ngos, seed=seed)
+        algorithm = AidMatchingAlgorithm(executor=executor)
+
+        matches = []
+        for strategy in strategies:
+            matches = algorithm.find_optimal_matches(ngos, crisis_areas, strategy=strategy)
+            measured = measure(lambda: algorithm.find_optimal_matches(ngos, crisis_areas, strategy=strategy), repeat)
+            record(size, n_ngos, f"find_optimal_matches[{strategy}]", measured, matches=len(matches))
+
+        # The split strategy's transportation problems alone, on one process
+        available_ngos = [ngo for ngo in ngos if not ngo.is_busy]
+        ngo_features, area_features = algorithm._features(available_ngos, crisis_areas)
+        rows, columns, distances, _, _ = algorithm.find_scored_pairs(
+            available_ngos, crisis_areas, ngo_features, area_features
+        )
+        split_arrays = {
+            "rows": rows,
+            "columns": columns,
+            "weights": algorithm._split_weights(ngo_features, area_features, rows, columns, distances),
+            "capacity": ngo_features.available.astype(np.int64),
+            "need": area_features.need.astype(np.int64)
+        }
+        flows = split_flows(split_arrays)
+        measured = measure(lambda: split_flows(split_arrays), repeat)
+        record(
+            size, n_ngos, "split_flows", measured,
+            pairs=int(rows.size), units=int(flows.sum()), edges_with_flow=int(np.count_nonzero(flows))
+        )
+
+        # Per-pair reference scoring over a sample of the reachable pairs
+        rows, columns, _ = algorithm.find_reachable_pairs(ngos, crisis_areas)
+        sample = np.random.default_rng(seed).permutation(rows.size)[:score_pairs]
+        pairs = [(ngos[rows[pair]], crisis_areas[columns[pair]]) for pair in sample.tolist()]
+        measured = measure(lambda: [algorithm.calculate_supply_match_score(ngo, area) for ngo, area in pairs], repeat)
+        record(
+            size, n_ngos, "calculate_supply_match_score", measured,
+            calls=len(pairs),
+            microseconds_per_call=round(measured["seconds"] / max(1, len(pairs)) * 1e6, 3),
+            reachable_pairs=int(rows.size)
+        )
+
+        # Donations of the last strategy's matches
+        measured = measure(lambda: algorithm.create_donation_records(matches), repeat)
+        record(size, n_ngos, "create_donation_records", measured, donations=len(matches), strategy=strategies[-1])
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ngo-share", type=float, default=0.2)
+    parser.add_argument("--strategies", nargs="+", default=["greedy", "optimal", "split"])
+    parser.add_argument("--score-pairs", type=int, default=100000, help="Pairs sampled for calculate_supply_match_score")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    # Large runs are split across MATCHING_PROCESSES processes, as in the API
+    executor = ComputeExecutor(threads=1, processes=settings.MATCHING_PROCESSES)
+    try:
+        results = run(args.sizes, args.ngo_share, args.strategies, args.score_pairs, args.repeat, args.seed, executor)
+    finally:
+        executor.shutdown()
+    with open(args.output, "w") as output:
+        json.dump({
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "ngo_share": args.ngo_share,
+            "matching_processes": settings.MATCHING_PROCESSES,
+            "results": results
+        }, output, indent=2)
@@ -0,0 +1,98 @@
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+import random
+
+from models.database import NGO, CrisisArea
+from models.types import SupplyCategory, ReachabilityLevel, SecurityLevel
+
+CATEGORIES = [category.value for category in SupplyCategory]
+
+# Unit each category is stocked in, and which categories expire
+UNITS = {"food": "kg", "water": "liters", "medical": "boxes", "shelter": "tents", "clothing": "pieces", "hygiene": "kits"}
+PERISHABLE = {"food", "water", "medical"}
+
+# Today's date, so generated lots are unexpired and the same for every instance of a day
+BASE_DATE = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+# Entities per region when the region count scales with the instance size
+ENTITIES_PER_REGION = 2000
+
+def generate_instance(
+    n_ngos: int,
+    n_crisis_areas: int,
+    seed: int = 0,
+    n_regions: Optional[int] = None,
+    region_spread_deg: float = 3.0
+) -> Tuple[List[NGO], List[CrisisArea]]:
+    """Generate reproducible NGOs and crisis areas clustered around a few regions.
+
+    By default the number of regions grows with the instance, so the density of
+    reachable pairs stays comparable from 1k to 100k entities.
+    """
+    rng = random.Random(seed)
+    if n_regions is None:
+        n_regions = max(8, (n_ngos + n_crisis_areas) // ENTITIES_PER_REGION)
+    regions = [(rng.uniform(-45, 55), rng.uniform(-170, 170)) for _ in range(n_regions)]
+
+    def location() -> Tuple[float, float]:
+        latitude, longitude = rng.choice(regions)
+        return (
+            max(-90.0, min(90.0, rng.gauss(latitude, region_spread_deg))),
+            (rng.gauss(longitude, region_spread_deg) + 180) % 360 - 180
+        )
+
+    ngos = []
+    for index in range(n_ngos):
+        latitude, longitude = location()
+        inventory = {
+            category: [
+                {
+                    "category": category,
+                    "quantity": rng.randint(50, 5000),
+                    "unit": UNITS[category],
+                    "expiry_date": (
+                        (BASE_DATE + timedelta(days=rng.randint(7, 365))).isoformat()
+                        if category in PERISHABLE else None
+                    )
+                }
+                for _ in range(rng.randint(1, 3))
+            ]
+            for category in rng.sample(CATEGORIES, rng.randint(1, 4))
+        }
+        ngos.append(NGO(
+            id=f"ngo-{index}",
+            name=f"NGO {index}",
+            is_busy=False,
+            working_hours={"start_time": "08:00", "end_time": "20:00", "days_of_week": list(range(7))},
+            latitude=latitude,
+            longitude=longitude,
+            reach_radius_km=rng.uniform(50, 300),
+            inventory=inventory,
+            replenishment_time_hours={category: 48 for category in inventory},
+            credibility_score=rng.uniform(0.5, 1.0),
+            specializations=rng.sample(CATEGORIES, rng.randint(0, 2))
+        ))
+
+    crisis_areas = []
+    for index in range(n_crisis_areas):
+        latitude, longitude = location()
+        categories = rng.sample(CATEGORIES, rng.randint(1, 4))
+        population = rng.randint(1000, 100000)
+        crisis_areas.append(CrisisArea(
+            id=f"area-{index}",
+            name=f"Crisis Area {index}",
+            latitude=latitude,
+            longitude=longitude,
+            # Needs scale with the affected population
+            current_needs={category: max(100, int(population * rng.uniform(0.01, 0.2))) for category in categories},
+            reachability=rng.choice(list(ReachabilityLevel)),
+            weather_conditions="Clear",
+            urgency_levels={category: rng.randint(1, 5) for category in categories},
+            population=population,
+            current_inventory={},
+            road_conditions="Open",
+            security_level=rng.choice(list(SecurityLevel)),
+            nearest_supply_routes=[]
+        ))
+
+    return ngos, crisis_areas
@@ -0,0 +1,164 @@
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import math
+import time
+
+from models.types import Location, SupplyCategory
+
+class LRUCache:
+    """Bounded least-recently-used cache whose entries also expire after a time-to-live."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict  # Called with the key of every entry that leaves the cache
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    def _is_expired(self, entry: Tuple[float, Any]) -> bool:
+        return self.ttl_seconds is not None and self.clock() - entry[0] > self.ttl_seconds
+
+    def _remove(self, key: Hashable):
+        del self._entries[key]
+        if self.on_evict:
+            self.on_evict(key)
+
+    def get(
+        self,
+        key: Hashable,
+        default: Any = None,
+        is_valid: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """Return the cached value and mark it as recently used, or `default` on a miss.
+
+        Values rejected by `is_valid` are dropped and reported as misses.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if self._is_expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        if is_valid is not None and not is_valid(entry[1]):
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond `max_size`."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._entries[key] = (self.clock(), value)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> bool:
+        """Drop a single entry; returns whether it was present."""
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        self.invalidations += 1
+        return True
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        if self.ttl_seconds is None:
+            return 0
+        expired = [key for key, entry in self._entries.items() if self._is_expired(entry)]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+class HeatmapCache:
+    """Heatmap results by snapped bounds, category and data version.
+
+    Bounds are widened to a snap_deg grid, so requests for nearly the same
+    view share one result. Every data change bumps version, which retires
+    earlier results; they age out through the LRU order and time-to-live.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, snap_deg: float):
+        self._entries = LRUCache(max_size, ttl_seconds)
+        self.snap_deg = snap_deg
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snap(self, bounds: Tuple[Location, Location]) -> Tuple[Location, Location]:
+        """The smallest bounds on the snap grid that contain the given SW, NE bounds."""
+        sw, ne = bounds
+
+        def down(value: float, limit: float) -> float:
+            return max(-limit, round(math.floor(value / self.snap_deg) * self.snap_deg, 9))
+
+        def up(value: float, limit: float) -> float:
+            return min(limit, round(math.ceil(value / self.snap_deg) * self.snap_deg, 9))
+
+        return (
+            Location(latitude=down(sw.latitude, 90), longitude=down(sw.longitude, 180)),
+            Location(latitude=up(ne.latitude, 90), longitude=up(ne.longitude, 180))
+        )
+
+    @staticmethod
+    def key(bounds: Tuple[Location, Location], category: Optional[SupplyCategory], version: int) -> Tuple:
+        sw, ne = bounds
+        return (sw.latitude, sw.longitude, ne.latitude, ne.longitude, category.value if category else None, version)
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        return self._entries.get(key)
+
+    def set(self, key: Tuple, data: Dict):
+        self._entries.set(key, data)
+
+    def bump(self):
+        """Record a data change; results cached before it are no longer served."""
+        self.version += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {**self._entries.stats(), "version": self.version}
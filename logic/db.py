@@ -1,6 +1,12 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models.database import Base
+from typing import Dict, List
+import csv
+import io
+import json
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from models.database import Base, Donation
 from settings import settings
 
 # Create database engine
@@ -9,6 +15,25 @@ engine = create_engine(settings.DATABASE_URL)
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncio drivers for the database backends
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    """The same database, reached through its asyncio driver."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# Request handlers use the async engine so queries never block the event loop;
+# worker threads (match scheduler, streamed commits, startup loading) keep the sync one
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL))
+
+# Committed objects stay loaded, since expired attributes cannot be lazily reloaded under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Donation columns in bulk insert order
+DONATION_COLUMNS = ("id", "ngo_id", "crisis_area_id", "supplies", "timestamp", "status")
+
 def get_db():
     """Get database session."""
     db = SessionLocal()
@@ -17,6 +42,51 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
     """Initialize database tables."""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+
+def _copy_donations(db: Session, donations: List[Dict]):
+    """Stream donation rows through PostgreSQL COPY inside the session's transaction."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for donation in donations:
+        writer.writerow((
+            donation["id"],
+            donation["ngo_id"],
+            donation["crisis_area_id"],
+            json.dumps(donation["supplies"]),
+            donation["timestamp"].isoformat(),
+            donation["status"].name  # Enum columns store member names
+        ))
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Donation.__tablename__} ({', '.join(DONATION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def insert_donations(db: Session, donations: List[Dict]) -> List[str]:
+    """Insert donation rows in bulk and return their IDs; the caller commits.
+
+    Rows carry their own IDs, so nothing has to be read back. Large batches on
+    PostgreSQL through psycopg2 go through COPY, everything else through one
+    executemany insert (also on asyncpg sessions bridged with run_sync).
+    """
+    if not donations:
+        return []
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2" and len(donations) >= settings.DONATION_COPY_THRESHOLD:
+        _copy_donations(db, donations)
+    else:
+        db.execute(insert(Donation), donations)
+    return [donation["id"] for donation in donations]
@@ -0,0 +1,96 @@
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import threading
+
+class ComputeExecutor:
+    """Runs CPU-heavy work off the event loop.
+
+    NumPy kernels that release the GIL go to a thread pool; pure-Python work
+    goes to a process pool, started on first use with the spawn method so its
+    workers do not inherit the server's threads. A call may carry a timeout,
+    after which the caller gets asyncio.TimeoutError while the work itself runs
+    to completion in the background. Per-pool counters (work in flight, queue
+    depth beyond the busy workers, outcomes) are reported by stats().
+    """
+
+    def __init__(self, threads: int, processes: int):
+        self.workers = {"thread": threads, "process": processes}
+        self._pools: Dict[str, Optional[Executor]] = {
+            "thread": ThreadPoolExecutor(max_workers=threads, thread_name_prefix="compute"),
+            "process": None
+        }
+        self._lock = threading.Lock()
+        self._metrics = {
+            pool: {"in_flight": 0, "max_in_flight": 0, "completed": 0, "failed": 0, "timed_out": 0}
+            for pool in self._pools
+        }
+
+    def _pool(self, pool: str) -> Executor:
+        with self._lock:
+            if self._pools[pool] is None:
+                self._pools[pool] = ProcessPoolExecutor(
+                    max_workers=self.workers[pool], mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pools[pool]
+
+    def _finished(self, pool: str, future: Future):
+        with self._lock:
+            metrics = self._metrics[pool]
+            metrics["in_flight"] -= 1
+            if future.cancelled() or future.exception() is not None:
+                metrics["failed"] += 1
+            else:
+                metrics["completed"] += 1
+
+    def _submit(self, pool: str, function: Callable, args: tuple) -> Future:
+        future = self._pool(pool).submit(function, *args)
+        with self._lock:
+            metrics = self._metrics[pool]
+            metrics["in_flight"] += 1
+            metrics["max_in_flight"] = max(metrics["max_in_flight"], metrics["in_flight"])
+        future.add_done_callback(lambda done: self._finished(pool, done))
+        return future
+
+    async def _run(self, pool: str, function: Callable, args: tuple, timeout: Optional[float]) -> Any:
+        future = self._submit(pool, function, args)
+        try:
+            # Shielded, so timing out does not try to cancel work that is already running
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._metrics[pool]["timed_out"] += 1
+            raise
+
+    async def run_in_thread(self, function: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a function in the thread pool and await its result."""
+        return await self._run("thread", function, args, timeout)
+
+    async def run_in_process(self, function: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a picklable module-level function in the process pool and await its result."""
+        return await self._run("process", function, args, timeout)
+
+    def submit_to_process(self, function: Callable, *args) -> Future:
+        """Submit a picklable module-level function to the process pool from synchronous code.
+
+        For work that already runs in a worker thread, such as a matching run
+        fanning out over its regions.
+        """
+        return self._submit("process", function, args)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                pool: {
+                    "workers": self.workers[pool],
+                    "queue_depth": max(0, metrics["in_flight"] - self.workers[pool]),
+                    **metrics
+                }
+                for pool, metrics in self._metrics.items()
+            }
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
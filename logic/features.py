@@ -0,0 +1,121 @@
+from typing import List, Optional, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import numpy as np
+
+from models.database import NGO, CrisisArea
+from models.types import SupplyCategory, ReachabilityLevel
+
+# Fixed column order for per-category arrays
+CATEGORIES = list(SupplyCategory)
+
+# Position of each reachability level, 0 (easy) to 3 (extreme)
+REACHABILITY_RANK = {level: rank for rank, level in enumerate(ReachabilityLevel)}
+
+SPECIALIZATION_BONUS = 1.2
+
+def lot_quantity(lot) -> float:
+    """Quantity of an inventory lot, stored either as a JSON dict or as a Supply."""
+    return lot["quantity"] if isinstance(lot, dict) else lot.quantity
+
+def lot_expiry(lot) -> Optional[datetime]:
+    """Expiry date of an inventory lot, stored either as a JSON dict or as a Supply."""
+    expiry = lot.get("expiry_date") if isinstance(lot, dict) else lot.expiry_date
+    if isinstance(expiry, str):
+        return datetime.fromisoformat(expiry)
+    return expiry
+
+def lot_expired(lot, as_of: datetime) -> bool:
+    """Whether an inventory lot expired before as_of (naive UTC, like the stored dates)."""
+    expiry = lot_expiry(lot)
+    if expiry is None:
+        return False
+    if expiry.tzinfo is not None:
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry < as_of
+
+def usable_quantity(lots: Optional[Sequence], as_of: datetime) -> float:
+    """Summed quantity of the lots that have not expired by as_of."""
+    return sum(lot_quantity(lot) for lot in lots or [] if not lot_expired(lot, as_of))
+
+@dataclass
+class NGOFeatures:
+    """Per-NGO arrays; category arrays have one column per SupplyCategory."""
+    available: np.ndarray  # Summed quantity of the unexpired inventory lots
+    specialization: np.ndarray  # SPECIALIZATION_BONUS where specialized, else 1.0
+    reach_radius_km: np.ndarray
+    credibility: np.ndarray
+
+    @classmethod
+    def from_ngos(cls, ngos: List[NGO], as_of: Optional[datetime] = None) -> "NGOFeatures":
+        as_of = as_of or datetime.utcnow()
+        available = np.zeros((len(ngos), len(CATEGORIES)))
+        specialization = np.ones((len(ngos), len(CATEGORIES)))
+        for row, ngo in enumerate(ngos):
+            for c, category in enumerate(CATEGORIES):
+                lots = ngo.inventory.get(category.value)
+                if lots:
+                    available[row, c] = usable_quantity(lots, as_of)
+                if category.value in ngo.specializations:
+                    specialization[row, c] = SPECIALIZATION_BONUS
+        return cls(
+            available=available,
+            specialization=specialization,
+            reach_radius_km=np.array([ngo.reach_radius_km for ngo in ngos], dtype=np.float64),
+            credibility=np.array([ngo.credibility_score for ngo in ngos], dtype=np.float64)
+        )
+
+@dataclass
+class AreaFeatures:
+    """Per-crisis-area arrays; category arrays have one column per SupplyCategory."""
+    need: np.ndarray  # current_needs, 0 where absent
+    urgency: np.ndarray  # urgency_levels normalized to 0-1, 1/5 where absent
+    reachability: np.ndarray  # 1 (easy) down to 0.25 (extreme)
+
+    @classmethod
+    def from_crisis_areas(cls, crisis_areas: List[CrisisArea]) -> "AreaFeatures":
+        need = np.zeros((len(crisis_areas), len(CATEGORIES)))
+        urgency = np.full((len(crisis_areas), len(CATEGORIES)), 1 / 5)
+        for column, area in enumerate(crisis_areas):
+            for c, category in enumerate(CATEGORIES):
+                need[column, c] = area.current_needs.get(category.value, 0)
+                urgency[column, c] = area.urgency_levels.get(category.value, 1) / 5
+        return cls(
+            need=need,
+            urgency=urgency,
+            reachability=np.array(
+                [1 - REACHABILITY_RANK[area.reachability] / 4 for area in crisis_areas], dtype=np.float64
+            )
+        )
+
+def category_match_scores(
+    ngo_features: NGOFeatures,
+    area_features: AreaFeatures,
+    rows: np.ndarray,
+    columns: np.ndarray,
+    c: int
+) -> np.ndarray:
+    """Supply match score of one category for every (NGO row, area column) pair.
+
+    fulfillment ratio (0-1) x normalized urgency x specialization bonus, and 0
+    where the area does not need the category.
+    """
+    need = area_features.need[columns, c]
+    fulfillment = np.divide(
+        ngo_features.available[rows, c], need,
+        out=np.zeros(need.size), where=need != 0
+    )
+    np.minimum(fulfillment, 1.0, out=fulfillment)
+    return fulfillment * area_features.urgency[columns, c] * ngo_features.specialization[rows, c]
+
+def supply_match_scores(
+    ngo_features: NGOFeatures,
+    area_features: AreaFeatures,
+    rows: np.ndarray,
+    columns: np.ndarray
+) -> np.ndarray:
+    """Supply match scores for every pair, one column per SupplyCategory."""
+    return np.stack([
+        category_match_scores(ngo_features, area_features, rows, columns, c)
+        for c in range(len(CATEGORIES))
+    ], axis=-1)
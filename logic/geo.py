@@ -0,0 +1,81 @@
+from typing import Sequence, Tuple, Union
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0  # Earth's radius in kilometers
+
+Coordinates = Union[Sequence[float], np.ndarray]
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers between two points (scalar version)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+def haversine_matrix(
+    lat1: Coordinates,
+    lon1: Coordinates,
+    lat2: Coordinates,
+    lon2: Coordinates,
+    dtype=np.float64
+) -> np.ndarray:
+    """Distances in kilometers between every point of the first set (rows) and the second set (columns).
+
+    The whole matrix is produced in one broadcast pass, reusing a single
+    output buffer so peak memory stays at roughly two rows x columns arrays.
+    """
+    dtype = np.dtype(dtype)
+    phi1 = np.radians(np.asarray(lat1, dtype=dtype))[:, None]
+    phi2 = np.radians(np.asarray(lat2, dtype=dtype))[None, :]
+    lmb1 = np.radians(np.asarray(lon1, dtype=dtype))[:, None]
+    lmb2 = np.radians(np.asarray(lon2, dtype=dtype))[None, :]
+
+    # sin^2(dphi / 2)
+    a = np.subtract(phi2, phi1, dtype=dtype)
+    a *= 0.5
+    np.sin(a, out=a)
+    np.square(a, out=a)
+
+    # cos(phi1) * cos(phi2) * sin^2(dlambda / 2)
+    b = np.subtract(lmb2, lmb1, dtype=dtype)
+    b *= 0.5
+    np.sin(b, out=b)
+    np.square(b, out=b)
+    b *= np.cos(phi1)
+    b *= np.cos(phi2)
+
+    a += b
+    del b
+    np.clip(a, 0.0, 1.0, out=a)
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+    return a
+
+def haversine_pairs(
+    lat1: Coordinates,
+    lon1: Coordinates,
+    lat2: Coordinates,
+    lon2: Coordinates,
+    dtype=np.float64
+) -> np.ndarray:
+    """Element-wise distances in kilometers between matching entries of two equally sized point sets."""
+    dtype = np.dtype(dtype)
+    phi1 = np.radians(np.asarray(lat1, dtype=dtype))
+    phi2 = np.radians(np.asarray(lat2, dtype=dtype))
+    dlmb = np.radians(np.asarray(lon2, dtype=dtype) - np.asarray(lon1, dtype=dtype))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def reach_deg(latitudes: Union[float, Coordinates], radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude half-widths, in degrees, of a box holding every point within radius_km.
+
+    The longitude half-width grows with latitude, to the whole circle once the
+    radius covers a pole.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    ratio = np.sin(angle) / np.cos(np.radians(np.asarray(latitudes, dtype=np.float64)))
+    longitude = np.where(ratio < 1, np.degrees(np.arcsin(np.minimum(ratio, 1.0))), 360.0)
+    return np.full(longitude.shape, np.degrees(angle)), longitude
@@ -3,6 +3,9 @@ import numpy as np
 from models.types import SupplyCategory, Location
 from models.database import CrisisArea
 from settings import settings
+from geo import EARTH_RADIUS_KM, haversine_matrix, haversine_pairs, reach_deg
+from snapshot import Snapshot
+from tiles import tile_latitude
 
 class HeatmapGenerator:
     def __init__(self):
@@ -10,6 +13,8 @@ class HeatmapGenerator:
         self.radius_km = settings.HEATMAP_RADIUS_KM
         self.min_grid_steps = settings.HEATMAP_MIN_GRID_STEPS
         self.gradient_colors = settings.HEATMAP_COLORS
+        self.mode = settings.HEATMAP_MODE
+        self.tile_max_steps = settings.HEATMAP_TILE_MAX_STEPS
         
     def _calculate_satisfaction_level(
         self, 
@@ -44,96 +49,214 @@ class HeatmapGenerator:
                     
             return weighted_satisfaction
     
-    def _haversine_distance(self, loc1: Location, loc2: Location) -> float:
-        """Calculate distance between two points in kilometers."""
-        R = 6371  # Earth's radius in kilometers
+    def grid_axes(self, bounds: Tuple[Location, Location]) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of the heatmap grid over the given SW, NE bounds."""
+        sw, ne = bounds
         
-        lat1, lon1 = np.radians(loc1.latitude), np.radians(loc1.longitude)
-        lat2, lon2 = np.radians(loc2.latitude), np.radians(loc2.longitude)
+        # Calculate grid dimensions
+        lat_steps = int((ne.latitude - sw.latitude) / self.resolution_km * 111)  # 111km per degree
+        lon_steps = int((ne.longitude - sw.longitude) / self.resolution_km * 111 * np.cos(np.radians(sw.latitude)))
         
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        # Ensure minimum number of steps
+        lat_steps = max(lat_steps, self.min_grid_steps)
+        lon_steps = max(lon_steps, self.min_grid_steps)
         
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+        return np.linspace(sw.latitude, ne.latitude, lat_steps), np.linspace(sw.longitude, ne.longitude, lon_steps)
+    
+    def tile_axes(self, z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of the grid cell centers of a slippy-map tile.
+
+        Every tile of a zoom level has the same number of cells, about
+        resolution_km wide at the equator, so neighbouring tiles line up.
+        """
+        tile_km = 2 * np.pi * EARTH_RADIUS_KM / (1 << z)
+        steps = int(np.clip(round(tile_km / self.resolution_km), self.min_grid_steps, self.tile_max_steps))
         
-        return R * c
+        centers = (np.arange(steps) + 0.5) / steps
+        latitudes = np.array([tile_latitude(z, row) for row in (y + 1 - centers).tolist()])  # South to north
+        longitudes = (x + centers) / (1 << z) * 360 - 180
+        return latitudes, longitudes
     
     def _calculate_intensity(
-        self, 
-        point: Location, 
-        crisis_areas: List[CrisisArea],
-        category: Optional[SupplyCategory] = None
-    ) -> Tuple[float, float]:
-        """Calculate intensity and satisfaction at a point based on nearby crisis areas."""
-        max_intensity = 0.0
-        weighted_satisfaction = 0.0
-        total_weight = 0.0
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        area_latitudes: np.ndarray,
+        area_longitudes: np.ndarray,
+        satisfaction: np.ndarray,
+        urgency: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate intensity and satisfaction at each point based on nearby crisis areas.
+
+        Points are processed in blocks of about HEATMAP_CHUNK_SIZE point/area
+        pairs, so memory stays bounded for any grid size.
+        """
+        intensity = np.zeros(latitudes.size)
+        avg_satisfaction = np.ones(latitudes.size)
+        chunk_size = max(1, settings.HEATMAP_CHUNK_SIZE // max(1, area_latitudes.size))
         
-        for area in crisis_areas:
-            distance = self._haversine_distance(point, area.location)
-            if distance > self.radius_km:
-                continue
-                
-            # Calculate distance weight (1 at center, 0 at radius)
-            weight = 1 - (distance / self.radius_km)
-            weight = weight ** 2  # Square to make it fall off more quickly
+        for start in range(0, latitudes.size, chunk_size):
+            end = start + chunk_size
+            # Distance weight (1 at center, 0 at and beyond the radius), squared to fall off more quickly
+            weights = haversine_matrix(latitudes[start:end], longitudes[start:end], area_latitudes, area_longitudes)
+            weights /= -self.radius_km
+            weights += 1
+            np.maximum(weights, 0.0, out=weights)
+            np.square(weights, out=weights)
             
-            # Calculate satisfaction level (0 = needs not met, 1 = fully met)
-            satisfaction = self._calculate_satisfaction_level(area, category)
-            
-            # Update weighted satisfaction
-            weighted_satisfaction += satisfaction * weight
-            total_weight += weight
+            # Satisfaction is the weighted average, 1 where no area is in range
+            total_weight = weights.sum(axis=1)
+            np.divide(
+                weights @ satisfaction, total_weight,
+                out=avg_satisfaction[start:end], where=total_weight > 0
+            )
             
-            # Calculate intensity based on urgency and distance
-            urgency = max(area.urgency_levels.values()) if area.urgency_levels else 1
-            intensity = urgency * weight
-            max_intensity = max(max_intensity, intensity)
+            # Intensity is the strongest urgency-weighted influence
+            weights *= urgency
+            intensity[start:end] = weights.max(axis=1, initial=0.0)
         
-        if total_weight == 0:
-            return 0.0, 1.0
+        return intensity, avg_satisfaction
+    
+    def _stencil_windows(
+        self,
+        axis: np.ndarray,
+        centers: np.ndarray,
+        half_widths: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """First and one-past-last index of the sorted grid axis values within each center's half width."""
+        slack = 1e-9  # Degrees, so rounding never drops a cell on the edge of the radius
+        return (
+            np.searchsorted(axis, centers - half_widths - slack, side="left"),
+            np.searchsorted(axis, centers + half_widths + slack, side="right")
+        )
+    
+    def _accumulate_stencils(
+        self,
+        lat_vals: np.ndarray,
+        lon_vals: np.ndarray,
+        area_latitudes: np.ndarray,
+        area_longitudes: np.ndarray,
+        satisfaction: np.ndarray,
+        urgency: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Intensity and satisfaction of every grid cell (latitude-major), scattered from each crisis area.
+
+        Each area only reaches the window of cells within radius_km of it, so
+        the work grows with areas x window size instead of grid size x areas.
+        Windows are processed in blocks of about HEATMAP_CHUNK_SIZE cell/area
+        pairs and summed into dense accumulators.
+        """
+        n_cells = lat_vals.size * lon_vals.size
+        intensity = np.zeros(n_cells)
+        total_weight = np.zeros(n_cells)
+        weighted_satisfaction = np.zeros(n_cells)
+        
+        lat_reach, lon_reach = reach_deg(area_latitudes, self.radius_km)
+        lat_start, lat_stop = self._stencil_windows(lat_vals, area_latitudes, lat_reach)
+        lon_start, lon_stop = self._stencil_windows(lon_vals, area_longitudes, lon_reach)
+        lon_count = lon_stop - lon_start
+        sizes = (lat_stop - lat_start) * lon_count
+        
+        areas = np.flatnonzero(sizes > 0)
+        ends = np.cumsum(sizes[areas])
+        begins = ends - sizes[areas]
+        start = 0
+        while start < areas.size:
+            # Consecutive areas whose windows fit in one block; an area larger than a block gets its own
+            stop = int(np.searchsorted(ends, begins[start] + settings.HEATMAP_CHUNK_SIZE, side="right"))
+            stop = max(stop, start + 1)
+            block = areas[start:stop]
+            start = stop
+            
+            # One entry per (area, cell in its window)
+            block_sizes = sizes[block]
+            pair_area = np.repeat(block, block_sizes)
+            offset = np.arange(block_sizes.sum()) - np.repeat(np.cumsum(block_sizes) - block_sizes, block_sizes)
+            rows = lat_start[pair_area] + offset // lon_count[pair_area]
+            columns = lon_start[pair_area] + offset % lon_count[pair_area]
+            cells = rows * lon_vals.size + columns
             
-        avg_satisfaction = weighted_satisfaction / total_weight
-        return max_intensity, avg_satisfaction
+            # Same weights as the dense path
+            weights = haversine_pairs(
+                lat_vals[rows], lon_vals[columns], area_latitudes[pair_area], area_longitudes[pair_area]
+            )
+            weights /= -self.radius_km
+            weights += 1
+            np.maximum(weights, 0.0, out=weights)
+            np.square(weights, out=weights)
+            
+            total_weight += np.bincount(cells, weights, minlength=n_cells)
+            weighted_satisfaction += np.bincount(cells, weights * satisfaction[pair_area], minlength=n_cells)
+            np.maximum.at(intensity, cells, weights * urgency[pair_area])
+        
+        avg_satisfaction = np.divide(
+            weighted_satisfaction, total_weight,
+            out=np.ones(n_cells), where=total_weight > 0
+        )
+        return intensity, avg_satisfaction
     
     def generate_heatmap_data(
         self, 
-        crisis_areas: List[CrisisArea],
+        snapshot: Snapshot,
         bounds: Tuple[Location, Location],  # SW, NE corners
         category: Optional[SupplyCategory] = None
     ) -> Dict:
-        """Generate heatmap data for the given geographic bounds."""
-        sw, ne = bounds
-        
-        # Calculate grid dimensions
-        lat_steps = int((ne.latitude - sw.latitude) / self.resolution_km * 111)  # 111km per degree
-        lon_steps = int((ne.longitude - sw.longitude) / self.resolution_km * 111 * np.cos(np.radians(sw.latitude)))
-        
-        # Ensure minimum number of steps
-        lat_steps = max(lat_steps, self.min_grid_steps)
-        lon_steps = max(lon_steps, self.min_grid_steps)
-        
-        # Generate grid points
-        lat_vals = np.linspace(sw.latitude, ne.latitude, lat_steps)
-        lon_vals = np.linspace(sw.longitude, ne.longitude, lon_steps)
+        """Generate heatmap data for the given geographic bounds from the snapshot's crisis areas."""
+        return self.generate_grid_data(snapshot, *self.grid_axes(bounds), category)
+    
+    def generate_tile_data(
+        self,
+        snapshot: Snapshot,
+        z: int,
+        x: int,
+        y: int,
+        category: Optional[SupplyCategory] = None
+    ) -> Dict:
+        """Generate heatmap data for a slippy-map tile from the snapshot's crisis areas."""
+        return self.generate_grid_data(snapshot, *self.tile_axes(z, x, y), category)
+    
+    def generate_grid_data(
+        self,
+        snapshot: Snapshot,
+        lat_vals: np.ndarray,
+        lon_vals: np.ndarray,
+        category: Optional[SupplyCategory] = None
+    ) -> Dict:
+        """Generate heatmap data over a grid given by its ascending latitudes and longitudes."""
+        # Crisis areas within the grid, padded by their radius of influence; the
+        # longitude padding is the widest one, at the latitude farthest from the equator
+        lat_padding = reach_deg(0.0, self.radius_km)[0]
+        south, north = lat_vals[0] - lat_padding, lat_vals[-1] + lat_padding
+        lon_padding = reach_deg(min(90.0, max(abs(south), abs(north))), self.radius_km)[1]
+        rows = snapshot.areas_within(south, lon_vals[0] - lon_padding, north, lon_vals[-1] + lon_padding)
+        if rows.size == 0:
+            return {"points": [], "gradient": self.gradient_colors}
         
-        points = []
-        for lat in lat_vals:
-            for lon in lon_vals:
-                point = Location(latitude=lat, longitude=lon)
-                intensity, satisfaction = self._calculate_intensity(point, crisis_areas, category)
-                
-                if intensity > 0:
-                    points.append({
-                        "lat": lat,
-                        "lng": lon,
-                        "intensity": intensity,
-                        "satisfaction": satisfaction
-                    })
+        areas = (
+            snapshot.areas["latitude"][rows],
+            snapshot.areas["longitude"][rows],
+            snapshot.area_satisfaction(category)[rows],
+            snapshot.areas["peak_urgency"][rows]
+        )
+        if self.mode == "stencil":
+            intensity, satisfaction = self._accumulate_stencils(lat_vals, lon_vals, *areas)
+        else:
+            # Grid points, latitude-major
+            latitudes = np.repeat(lat_vals, lon_vals.size)
+            longitudes = np.tile(lon_vals, lat_vals.size)
+            intensity, satisfaction = self._calculate_intensity(latitudes, longitudes, *areas)
         
+        points = np.flatnonzero(intensity > 0)
         return {
-            "points": points,
+            "points": [
+                {"lat": lat, "lng": lng, "intensity": value, "satisfaction": level}
+                for lat, lng, value, level in zip(
+                    lat_vals[points // lon_vals.size].tolist(),
+                    lon_vals[points % lon_vals.size].tolist(),
+                    intensity[points].tolist(),
+                    satisfaction[points].tolist()
+                )
+            ],
             "gradient": self.gradient_colors
         }
     
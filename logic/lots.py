@@ -0,0 +1,64 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import heapq
+
+from models.database import NGO
+from models.types import Supply, SupplyCategory
+from features import lot_expired, lot_expiry, lot_quantity
+
+def lot_unit(lot) -> str:
+    return lot.get("unit", "units") if isinstance(lot, dict) else lot.unit
+
+def _expiry_key(expiry: Optional[datetime]) -> Tuple[bool, float]:
+    # Lots without an expiry date go last
+    return (expiry is None, expiry.timestamp() if expiry else 0.0)
+
+class LotIndex:
+    """NGO inventory lots in first-expired-first-out order, shared by a whole match run.
+
+    Each (NGO, category) heap is built the first time it is drawn from and then
+    keeps track of what this run already allocated, so taking k lots costs
+    O(k log n) without re-sorting the inventory for every crisis area. Lots that
+    expired before as_of (by default, when the index is built) are never drawn.
+    """
+
+    def __init__(self, ngos: List[NGO], as_of: Optional[datetime] = None):
+        self.ngos = ngos
+        self.as_of = as_of or datetime.utcnow()
+        # (NGO row, category) -> heap of [expiry key, lot position, remaining quantity, lot]
+        self._heaps: Dict[Tuple[int, str], List[list]] = {}
+
+    def _heap(self, row: int, category: str) -> List[list]:
+        heap = self._heaps.get((row, category))
+        if heap is None:
+            heap = [
+                [_expiry_key(lot_expiry(lot)), position, lot_quantity(lot), lot]
+                for position, lot in enumerate(self.ngos[row].inventory.get(category, []))
+                if lot_quantity(lot) > 0 and not lot_expired(lot, self.as_of)
+            ]
+            heapq.heapify(heap)
+            self._heaps[(row, category)] = heap
+        return heap
+
+    def allocate(self, row: int, category: SupplyCategory, quantity: int) -> List[Supply]:
+        """Take a quantity of a category from an NGO, earliest-expiring lots first.
+
+        Returns one Supply per source lot, with the lot's unit and expiry date.
+        """
+        heap = self._heap(row, category.value)
+        supplies = []
+        while quantity > 0 and heap:
+            entry = heap[0]
+            taken = min(quantity, entry[2])
+            lot = entry[3]
+            supplies.append(Supply(
+                category=category,
+                quantity=taken,
+                unit=lot_unit(lot),
+                expiry_date=lot_expiry(lot)
+            ))
+            quantity -= taken
+            entry[2] -= taken
+            if entry[2] == 0:
+                heapq.heappop(heap)  # A partly used lot keeps its place at the top
+        return supplies
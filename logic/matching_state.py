@@ -0,0 +1,170 @@
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+import threading
+import numpy as np
+
+# (ngos, crisis_areas) -> (ngo indices, area indices, distances)
+PairFinder = Callable[[Sequence, Sequence], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+# (ngos, crisis_areas, ngo indices, area indices, distances) -> (scores, sends supplies)
+PairScorer = Callable[[Sequence, Sequence, np.ndarray, np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+# (dirty NGO ids, dirty crisis area ids)
+DirtySets = Tuple[Set[str], Set[str]]
+
+def _remap(previous_ids: List[str], positions: dict) -> np.ndarray:
+    """Position of every previously known id in the current list, or -1 if it is gone."""
+    return np.array([positions.get(entity_id, -1) for entity_id in previous_ids], dtype=np.int64)
+
+class MatchingState:
+    """Reachable NGO/crisis-area pairs and their scores, kept between match runs.
+
+    Rows (NGOs) and columns (crisis areas) are marked dirty when they change; a
+    refresh recomputes pairs only for dirty, new or re-appearing entities and
+    carries every other pair over, remapped to the positions of the current run.
+
+    A run takes the dirty marks before it reads the entities, so an entity
+    changed while the run is in progress is marked again and stays dirty for
+    the next one.
+    """
+
+    def __init__(self):
+        self.ngo_ids: List[str] = []
+        self.area_ids: List[str] = []
+        self.dirty_ngos: Set[str] = set()
+        self.dirty_areas: Set[str] = set()
+        self.version = 0  # Bumped on every refresh that recomputed something
+        self.recomputed_pairs = 0  # Pairs scored by the latest refresh
+        self._dirty_lock = threading.Lock()  # Marks come from request handlers while a run is in progress
+        self._clear_pairs()
+
+    def _clear_pairs(self):
+        self.pair_ngos = np.zeros(0, dtype=np.int64)
+        self.pair_areas = np.zeros(0, dtype=np.int64)
+        self.pair_distances = np.zeros(0)
+        self.pair_scores = np.zeros(0)
+        self.pair_sends = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.pair_ngos.size
+
+    def mark_ngo_dirty(self, ngo_id: str):
+        with self._dirty_lock:
+            self.dirty_ngos.add(ngo_id)
+
+    def mark_crisis_area_dirty(self, area_id: str):
+        with self._dirty_lock:
+            self.dirty_areas.add(area_id)
+
+    def take_dirty(self) -> DirtySets:
+        """Hand out the dirty marks and start collecting new ones, in one step."""
+        with self._dirty_lock:
+            dirty = (self.dirty_ngos, self.dirty_areas)
+            self.dirty_ngos, self.dirty_areas = set(), set()
+        return dirty
+
+    def restore_dirty(self, dirty: DirtySets):
+        """Put back marks taken by a run that did not refresh the pairs."""
+        with self._dirty_lock:
+            self.dirty_ngos |= dirty[0]
+            self.dirty_areas |= dirty[1]
+
+    def reset(self):
+        """Forget every pair so the next refresh recomputes everything."""
+        with self._dirty_lock:
+            self.ngo_ids, self.area_ids = [], []
+            self.dirty_ngos, self.dirty_areas = set(), set()
+            self._clear_pairs()
+
+    def refresh(
+        self,
+        ngos: Sequence,
+        crisis_areas: Sequence,
+        find_pairs: PairFinder,
+        score_pairs: PairScorer,
+        dirty: Optional[DirtySets] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Bring the pairs up to date for this run's NGOs and crisis areas.
+
+        `dirty` holds the marks taken with take_dirty() before the entities were
+        read; without it the current marks are taken here. Returns NGO indices,
+        crisis area indices, distances, scores and whether the pair would send any
+        supplies, all indexed by position in the given lists and sorted by crisis
+        area and then by NGO.
+        """
+        dirty_ngos, dirty_areas = dirty if dirty is not None else self.take_dirty()
+        try:
+            return self._refresh(ngos, crisis_areas, find_pairs, score_pairs, dirty_ngos, dirty_areas)
+        except Exception:
+            self.restore_dirty((dirty_ngos, dirty_areas))
+            raise
+
+    def _refresh(
+        self,
+        ngos: Sequence,
+        crisis_areas: Sequence,
+        find_pairs: PairFinder,
+        score_pairs: PairScorer,
+        dirty_ngos: Set[str],
+        dirty_areas: Set[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        ngo_positions = {ngo.id: position for position, ngo in enumerate(ngos)}
+        area_positions = {area.id: position for position, area in enumerate(crisis_areas)}
+
+        # Carry over pairs whose NGO and crisis area are both still present and clean
+        ngo_map = _remap(self.ngo_ids, ngo_positions)
+        area_map = _remap(self.area_ids, area_positions)
+        pair_ngos = ngo_map[self.pair_ngos]
+        pair_areas = area_map[self.pair_areas]
+
+        fresh_ngos = np.ones(len(ngos), dtype=bool)
+        fresh_ngos[ngo_map[ngo_map >= 0]] = False
+        fresh_ngos[[ngo_positions[i] for i in dirty_ngos if i in ngo_positions]] = True
+        fresh_areas = np.ones(len(crisis_areas), dtype=bool)
+        fresh_areas[area_map[area_map >= 0]] = False
+        fresh_areas[[area_positions[i] for i in dirty_areas if i in area_positions]] = True
+
+        keep = (pair_ngos >= 0) & (pair_areas >= 0)
+        keep[keep] = ~fresh_ngos[pair_ngos[keep]] & ~fresh_areas[pair_areas[keep]]
+
+        # New pairs: fresh NGOs against every area, then clean NGOs against fresh areas
+        fresh_ngo_ids = np.flatnonzero(fresh_ngos)
+        clean_ngo_ids = np.flatnonzero(~fresh_ngos)
+        fresh_area_ids = np.flatnonzero(fresh_areas)
+        new_ngos, new_areas, new_distances = [], [], []
+        if fresh_ngo_ids.size and crisis_areas:
+            rows, columns, distances = find_pairs([ngos[i] for i in fresh_ngo_ids], crisis_areas)
+            new_ngos.append(fresh_ngo_ids[rows])
+            new_areas.append(columns)
+            new_distances.append(distances)
+        if clean_ngo_ids.size and fresh_area_ids.size:
+            rows, columns, distances = find_pairs(
+                [ngos[i] for i in clean_ngo_ids], [crisis_areas[j] for j in fresh_area_ids]
+            )
+            new_ngos.append(clean_ngo_ids[rows])
+            new_areas.append(fresh_area_ids[columns])
+            new_distances.append(distances)
+
+        pair_ngos, pair_areas = [pair_ngos[keep]], [pair_areas[keep]]
+        pair_distances, pair_scores, pair_sends = [self.pair_distances[keep]], [self.pair_scores[keep]], [self.pair_sends[keep]]
+        self.recomputed_pairs = 0
+        if new_ngos:
+            rows, columns, distances = np.concatenate(new_ngos), np.concatenate(new_areas), np.concatenate(new_distances)
+            scores, sends = score_pairs(ngos, crisis_areas, rows, columns, distances)
+            pair_ngos.append(rows)
+            pair_areas.append(columns)
+            pair_distances.append(distances)
+            pair_scores.append(scores)
+            pair_sends.append(sends)
+            self.recomputed_pairs = rows.size
+
+        pair_ngos, pair_areas = np.concatenate(pair_ngos), np.concatenate(pair_areas)
+        order = np.lexsort((pair_ngos, pair_areas))
+        self.pair_ngos, self.pair_areas = pair_ngos[order], pair_areas[order]
+        self.pair_distances = np.concatenate(pair_distances)[order]
+        self.pair_scores = np.concatenate(pair_scores)[order]
+        self.pair_sends = np.concatenate(pair_sends)[order]
+
+        self.ngo_ids = list(ngo_positions)
+        self.area_ids = list(area_positions)
+        if fresh_ngo_ids.size or fresh_area_ids.size or not keep.all():
+            self.version += 1
+
+        return self.pair_ngos, self.pair_areas, self.pair_distances, self.pair_scores, self.pair_sends
@@ -67,6 +67,14 @@ class Donation(Base):
     ngo = relationship("NGO", back_populates="donations")
     crisis_area = relationship("CrisisArea", back_populates="donations_received")
 
+class TravelCost(Base):
+    __tablename__ = "travel_costs"
+
+    # Road travel cost along supply routes, within the NGO's reach radius
+    ngo_id = Column(String, ForeignKey("ngos.id"), primary_key=True)
+    crisis_area_id = Column(String, ForeignKey("crisis_areas.id"), primary_key=True)
+    cost_km = Column(Float, nullable=False)
+
 class User(Base):
     __tablename__ = "users"
 
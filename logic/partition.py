@@ -0,0 +1,173 @@
+from typing import Callable, Dict, List, Tuple
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import numpy as np
+
+from graph import connected_components
+from assignment import auction_assignment
+from flow import max_weight_transportation
+
+# Shared memory block name, shape and dtype of an array
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# Work units per worker process, so uneven components still balance out
+TASKS_PER_PROCESS = 4
+
+def greedy_selection(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Serve crisis areas in column order, each taking its best-scoring NGO still available.
+
+    Pairs must be grouped by crisis area, and crisis areas of the same connected
+    component must appear in column order. Returns the selected pair indices.
+    """
+    rows, columns, scores, sends = arrays["rows"], arrays["columns"], arrays["scores"], arrays["sends"]
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    is_available = np.ones(int(rows.max()) + 1, dtype=bool)
+    area_starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1, [rows.size]))
+
+    selected = []
+    for start, end in zip(area_starts[:-1].tolist(), area_starts[1:].tolist()):
+        candidate_scores = np.where(is_available[rows[start:end]], scores[start:end], 0.0)
+        if not (candidate_scores > 0).any():
+            continue
+        # First highest-scoring NGO still available; it stays available if it has nothing to send
+        pair = start + int(np.argmax(candidate_scores))
+        if sends[pair]:
+            selected.append(pair)
+            is_available[rows[pair]] = False
+    return np.array(selected, dtype=np.int64)
+
+def optimal_selection(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Pick the one-to-one NGO/crisis area pairs with the highest total score.
+
+    Returns the selected pair indices.
+    """
+    rows, columns, scores, sends = arrays["rows"], arrays["columns"], arrays["scores"], arrays["sends"]
+    # Only pairs that would actually send supplies are worth assigning
+    feasible = np.flatnonzero(sends & (scores > 0))
+    if feasible.size == 0:
+        return feasible
+    assigned = auction_assignment(
+        columns[feasible], rows[feasible], scores[feasible],
+        int(columns[feasible].max()) + 1, int(rows[feasible].max()) + 1
+    )
+    return feasible[assigned[columns[feasible]] == rows[feasible]]
+
+def split_flows(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Units of each supply category sent along each pair, one column per category.
+
+    Each category is solved as a transportation problem bounded by the NGO
+    capacities and the crisis area needs, maximizing the per-unit weights.
+    """
+    rows, columns, weights = arrays["rows"], arrays["columns"], arrays["weights"]
+    capacity, need = arrays["capacity"], arrays["need"]
+    flows = np.zeros(weights.shape, dtype=np.int64)
+    for c in range(weights.shape[1]):
+        candidates = np.flatnonzero((weights[:, c] > 0) & (capacity[rows, c] > 0) & (need[columns, c] > 0))
+        if candidates.size:
+            flows[candidates, c] = max_weight_transportation(
+                capacity[:, c], need[:, c], rows[candidates], columns[candidates], weights[candidates, c]
+            )
+    return flows
+
+SOLVERS = {
+    "greedy": greedy_selection,
+    "optimal": optimal_selection,
+    "split": split_flows
+}
+
+# Arrays with one entry per pair; the others (e.g. capacity, need) are shared whole
+PAIR_ARRAYS = ("rows", "columns", "scores", "sends", "weights")
+
+class SharedArrays:
+    """NumPy arrays copied once into shared memory, so worker processes can map them without pickling."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.blocks: List[shared_memory.SharedMemory] = []
+        self.specs: Dict[str, ArraySpec] = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _solve_shared(strategy: str, specs: Dict[str, ArraySpec], start: int, end: int):
+    """Worker process entry point: solve the pairs in [start, end) of the shared arrays."""
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs.values()]
+    try:
+        arrays = {}
+        for block, (key, (_, shape, dtype)) in zip(blocks, specs.items()):
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            # Copy out so nothing references the buffers once they are closed
+            arrays[key] = array[start:end].copy() if key in PAIR_ARRAYS else array.copy()
+        return SOLVERS[strategy](arrays)
+    finally:
+        for block in blocks:
+            block.close()
+
+def _task_ranges(pair_components: np.ndarray, n_tasks: int) -> List[Tuple[int, int]]:
+    """Cut pairs sorted by component into about n_tasks ranges of whole components."""
+    component_starts = np.concatenate(([0], np.flatnonzero(np.diff(pair_components)) + 1))
+    target = max(1, -(-pair_components.size // n_tasks))
+    cuts = np.unique(component_starts[np.searchsorted(
+        component_starts, np.arange(0, pair_components.size, target), side="right"
+    ) - 1])
+    bounds = np.concatenate((cuts, [pair_components.size])).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def solve_partitioned(
+    strategy: str,
+    n_ngos: int,
+    arrays: Dict[str, np.ndarray],
+    n_tasks: int,
+    submit: Callable[..., Future]
+) -> np.ndarray:
+    """Solve a matching strategy on each connected component of the reachability graph.
+
+    NGOs and crisis areas only interact through pairs, so every component is an
+    independent problem. Components are grouped into about n_tasks ranges of
+    roughly equal size, each handed to `submit` (a process pool) and solved
+    from inputs in shared memory.
+
+    Greedy selects exactly what the serial solver selects. Split reaches the
+    same optimal total weight, though ties may be broken differently. Optimal
+    solves each component by auction, so its total is only guaranteed to be
+    within the auction's epsilon bound of the optimum, like the serial run; the
+    assignments themselves can differ from the serial run.
+    """
+    rows, columns = arrays["rows"], arrays["columns"]
+    labels = connected_components(n_ngos + int(columns.max()) + 1, rows, n_ngos + columns)
+    # Stable, so crisis areas keep their order within each component
+    order = np.argsort(labels[rows], kind="stable")
+    ranges = _task_ranges(labels[rows][order], n_tasks)
+
+    shared = {key: (array[order] if key in PAIR_ARRAYS else array) for key, array in arrays.items()}
+    with SharedArrays(shared) as shared_arrays:
+        futures = [
+            submit(_solve_shared, strategy, shared_arrays.specs, start, end)
+            for start, end in ranges
+        ]
+        results = [future.result() for future in futures]
+
+    if strategy == "split":
+        flows = np.zeros(arrays["weights"].shape, dtype=np.int64)
+        for (start, end), result in zip(ranges, results):
+            flows[order[start:end]] = result
+        return flows
+    selected = np.concatenate(
+        [order[start + result] for (start, _), result in zip(ranges, results)] + [np.zeros(0, dtype=np.int64)]
+    )
+    return np.sort(selected)
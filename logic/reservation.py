@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from models.database import NGO, CrisisArea
+from models.types import Supply
+from features import lot_quantity
+from lots import lot_expiry, lot_unit
+
+# Category, unit and expiry date identifying the lots a Supply was drawn from
+LotKey = Tuple[str, str, Optional[datetime]]
+
+def _lot_key(category: str, lot) -> LotKey:
+    return category, lot_unit(lot), lot_expiry(lot)
+
+def take_from_lots(lots: List[Dict], key: LotKey, quantity: int) -> List[Dict]:
+    """Remove a quantity from the lots matching a key, dropping lots that run empty."""
+    remaining = []
+    for lot in lots:
+        taken = min(quantity, lot_quantity(lot)) if _lot_key(key[0], lot) == key else 0
+        quantity -= taken
+        if taken < lot_quantity(lot):
+            remaining.append({**lot, "quantity": lot_quantity(lot) - taken})
+    return remaining
+
+def reserve_inventory(db: Session, matches: List[Tuple[NGO, CrisisArea, List[Supply]]]) -> List[int]:
+    """Lock the matched NGOs and take each match's supplies out of their source lots.
+
+    NGO rows are selected FOR UPDATE SKIP LOCKED, so a concurrent commit holding
+    some of them does not block this one: matches on NGOs locked elsewhere, or
+    whose inventory no longer covers them, are skipped. The inventory changes
+    are part of the session's transaction and are only written with its commit,
+    together with the donations. Returns the positions of the reserved matches.
+    """
+    ngo_ids = {ngo.id for ngo, _, _ in matches}
+    locked = {
+        ngo.id: ngo
+        for ngo in db.query(NGO)
+        .filter(NGO.id.in_(ngo_ids), NGO.is_busy == False)
+        .with_for_update(skip_locked=True)
+        .populate_existing()
+        .all()
+    }
+
+    reserved = []
+    inventories: Dict[str, Dict[str, List[Dict]]] = {}
+    for position, (ngo, _, supplies) in enumerate(matches):
+        if ngo.id not in locked:
+            continue
+        inventory = inventories.setdefault(ngo.id, dict(locked[ngo.id].inventory))
+
+        # Supplies name their source lots by unit and expiry date
+        requested: Dict[LotKey, int] = defaultdict(int)
+        for supply in supplies:
+            requested[(supply.category.value, supply.unit, supply.expiry_date)] += supply.quantity
+        if any(
+            sum(lot_quantity(lot) for lot in inventory.get(key[0], []) if _lot_key(key[0], lot) == key) < quantity
+            for key, quantity in requested.items()
+        ):
+            continue
+
+        for key, quantity in requested.items():
+            inventory[key[0]] = take_from_lots(inventory[key[0]], key, quantity)
+        reserved.append(position)
+
+    # Assign new dicts so the JSON columns are flagged as modified
+    for ngo_id, inventory in inventories.items():
+        locked[ngo_id].inventory = inventory
+    return reserved
@@ -0,0 +1,209 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import heapq
+import numpy as np
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from models.database import NGO, CrisisArea, TravelCost
+from settings import settings
+from geo import haversine_km
+from spatial import SpatialIndex
+
+class NGOReach(NamedTuple):
+    """The NGO fields road travel costs depend on, cheap to send to a worker process."""
+    id: str
+    latitude: float
+    longitude: float
+    reach_radius_km: float
+
+class AreaRoute(NamedTuple):
+    """The crisis area fields road travel costs depend on."""
+    id: str
+    latitude: float
+    longitude: float
+    nearest_supply_routes: List[Dict]
+
+def ngo_reach(ngo: NGO) -> NGOReach:
+    return NGOReach(ngo.id, ngo.latitude, ngo.longitude, ngo.reach_radius_km)
+
+def area_route(area: CrisisArea) -> AreaRoute:
+    return AreaRoute(area.id, area.latitude, area.longitude, area.nearest_supply_routes or [])
+
+def compute_travel_costs(
+    ngos: Sequence[NGOReach],
+    crisis_areas: Sequence[AreaRoute]
+) -> Tuple[Set[str], Dict[Tuple[str, str], float]]:
+    """Routed crisis areas and the given NGOs' road travel costs to them.
+
+    Pure Python and free of shared state, so it can run in a worker process.
+    """
+    graph = RouteGraph(crisis_areas)
+    costs = {}
+    for ngo, access in zip(ngos, graph.access_table(ngos)):
+        for area_id, cost in graph.travel_costs(access, ngo.reach_radius_km).items():
+            costs[(ngo.id, area_id)] = cost
+    return set(graph.area_ids), costs
+
+def _route_points(area: CrisisArea) -> List[Tuple[float, float]]:
+    return [(point["latitude"], point["longitude"]) for point in area.nearest_supply_routes or []]
+
+class RouteGraph:
+    """Road network formed by the crisis areas' supply routes.
+
+    Each area's nearest_supply_routes is a polyline of waypoints ending at the
+    area. Waypoints shared by several routes (equal at ROUTE_HUB_PRECISION
+    decimals) become a single hub, which joins the routes into one network.
+    Hubs are nodes 0..H-1 and routed crisis areas follow them.
+    """
+
+    def __init__(self, crisis_areas: Sequence[CrisisArea]):
+        self.area_nodes: Dict[str, int] = {}
+        hub_ids: Dict[Tuple[float, float], int] = {}
+        edges: List[Tuple[int, int, float]] = []
+        points: List[Tuple[float, float]] = []
+
+        def hub(latitude: float, longitude: float) -> int:
+            key = (round(latitude, settings.ROUTE_HUB_PRECISION), round(longitude, settings.ROUTE_HUB_PRECISION))
+            if key not in hub_ids:
+                hub_ids[key] = len(points)
+                points.append((latitude, longitude))
+            return hub_ids[key]
+
+        routes = []
+        for area in crisis_areas:
+            waypoints = _route_points(area)
+            if waypoints:
+                routes.append((area, [hub(*waypoint) for waypoint in waypoints]))
+        self.n_hubs = len(points)
+        self.hub_latitudes: List[float] = [latitude for latitude, _ in points]
+        self.hub_longitudes: List[float] = [longitude for _, longitude in points]
+
+        for area, path in routes:
+            node = self.n_hubs + len(self.area_nodes)
+            self.area_nodes[area.id] = node
+            points.append((area.latitude, area.longitude))
+            for u, v in zip(path + [node], path[1:] + [node]):
+                if u != v:
+                    edges.append((u, v, haversine_km(*points[u], *points[v])))
+
+        self.area_ids = list(self.area_nodes)
+        self.adjacency: List[List[Tuple[int, float]]] = [[] for _ in points]
+        for u, v, length in edges:
+            self.adjacency[u].append((v, length))
+            self.adjacency[v].append((u, length))
+
+    def access_table(self, ngos: Sequence[NGO]) -> List[List[Tuple[int, float]]]:
+        """Straight-line legs from each NGO to every hub within its reach radius."""
+        table: List[List[Tuple[int, float]]] = [[] for _ in ngos]
+        if not ngos or self.n_hubs == 0:
+            return table
+        index = SpatialIndex(
+            [ngo.latitude for ngo in ngos],
+            [ngo.longitude for ngo in ngos],
+            [ngo.reach_radius_km for ngo in ngos]
+        )
+        rows, hubs, distances = index.query_pairs(self.hub_latitudes, self.hub_longitudes)
+        for row, hub, distance in zip(rows.tolist(), hubs.tolist(), distances.tolist()):
+            table[row].append((hub, distance))
+        return table
+
+    def travel_costs(self, access: List[Tuple[int, float]], limit_km: float) -> Dict[str, float]:
+        """Multi-source Dijkstra from an NGO's access hubs to every routed crisis area within limit_km."""
+        distance: Dict[int, float] = {}
+        heap = [(cost, hub) for hub, cost in access]
+        heapq.heapify(heap)
+        costs = {}
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in distance:
+                continue
+            distance[u] = d
+            if u >= self.n_hubs:
+                costs[self.area_ids[u - self.n_hubs]] = d
+                continue  # Routes end at their crisis area
+            for v, length in self.adjacency[u]:
+                nd = d + length
+                if nd <= limit_km and v not in distance:
+                    heapq.heappush(heap, (nd, v))
+        return costs
+
+class TravelCostMatrix:
+    """Road travel cost from NGOs to the crisis areas that have supply routes.
+
+    Routed crisis areas are reached along their routes only: an NGO drives
+    straight to a hub in reach, then follows the road network. Costs are kept
+    for pairs within the NGO's reach radius and persisted in the travel_costs
+    table; a route change recomputes only the NGOs that can reach it.
+    """
+
+    def __init__(self):
+        self.costs: Dict[Tuple[str, str], float] = {}
+        self.routed_areas: Set[str] = set()
+        self.version = 0  # Bumped on every change
+
+    def __len__(self) -> int:
+        return len(self.costs)
+
+    def lookup(self, ngo_id: str, area_id: str) -> Optional[float]:
+        return self.costs.get((ngo_id, area_id))
+
+    def rebuild(self, ngos: List[NGO], crisis_areas: List[CrisisArea]):
+        """Recompute every NGO's travel costs."""
+        self.routed_areas, self.costs = compute_travel_costs(
+            [ngo_reach(ngo) for ngo in ngos], [area_route(area) for area in crisis_areas]
+        )
+        self.version += 1
+
+    def affected_ngos(self, ngos: List[NGO], changed_points: Iterable[Tuple[float, float]]) -> List[NGO]:
+        """NGOs within reach of any changed location.
+
+        A path no longer than an NGO's reach radius never leaves that radius, so
+        no other NGO's costs can change.
+        """
+        changed_points = list(changed_points)
+        if not changed_points or not ngos:
+            return []
+        index = SpatialIndex(
+            [ngo.latitude for ngo in ngos],
+            [ngo.longitude for ngo in ngos],
+            [ngo.reach_radius_km for ngo in ngos]
+        )
+        rows, _, _ = index.query_pairs(
+            [latitude for latitude, _ in changed_points],
+            [longitude for _, longitude in changed_points]
+        )
+        return [ngos[row] for row in np.unique(rows).tolist()]
+
+    def apply(self, ngo_ids: Set[str], routed_areas: Set[str], costs: Dict[Tuple[str, str], float]):
+        """Replace the given NGOs' costs by ones from compute_travel_costs."""
+        self.routed_areas = routed_areas
+        self.costs = {key: cost for key, cost in self.costs.items() if key[0] not in ngo_ids}
+        self.costs.update(costs)
+        self.version += 1
+
+    def load(self, db: Session):
+        """Load persisted costs; the routed areas come from the crisis areas' routes."""
+        self.costs = {
+            (row.ngo_id, row.crisis_area_id): row.cost_km
+            for row in db.query(TravelCost).all()
+        }
+        self.routed_areas = {
+            area_id for area_id, routes in db.query(CrisisArea.id, CrisisArea.nearest_supply_routes) if routes
+        }
+        self.version += 1
+
+    def save(self, db: Session, ngo_ids: Optional[Set[str]] = None):
+        """Replace the persisted costs of the given NGOs (all NGOs by default); the caller commits."""
+        if ngo_ids is None:
+            db.execute(delete(TravelCost))
+            rows = self.costs.items()
+        else:
+            db.execute(delete(TravelCost).where(TravelCost.ngo_id.in_(ngo_ids)))
+            rows = [(key, cost) for key, cost in self.costs.items() if key[0] in ngo_ids]
+        values = [
+            {"ngo_id": ngo_id, "crisis_area_id": area_id, "cost_km": cost}
+            for (ngo_id, area_id), cost in rows
+        ]
+        if values:
+            db.execute(insert(TravelCost), values)
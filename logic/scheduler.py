@@ -0,0 +1,164 @@
+from typing import Callable, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime, UTC
+import asyncio
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from algorithm import AidMatchingAlgorithm
+from executor import ComputeExecutor
+from models.database import NGO, CrisisArea
+from models.types import Supply
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MatchPlan:
+    """Matches computed from one snapshot of the database."""
+    version: int
+    strategy: str
+    computed_at: datetime
+    matches: List[Tuple[NGO, CrisisArea, List[Supply]]]
+
+class MatchScheduler:
+    """Recomputes the match plan in the background and keeps the latest one in memory.
+
+    A run starts when data changes (trigger(), debounced so a burst of PATCH
+    events costs one run) or when the refresh interval elapses. The matching
+    itself runs in a worker thread (on the compute executor when given) so the
+    event loop stays responsive; waiting for a plan gives up after the timeout.
+    """
+
+    def __init__(
+        self,
+        algorithm: AidMatchingAlgorithm,
+        session_factory: Callable[[], Session],
+        strategy: str = "greedy",
+        debounce_seconds: float = 2.0,
+        interval_seconds: float = 300.0,
+        executor: Optional[ComputeExecutor] = None,
+        timeout_seconds: Optional[float] = None
+    ):
+        self.algorithm = algorithm
+        self.session_factory = session_factory
+        self.strategy = strategy
+        self.debounce_seconds = debounce_seconds
+        self.interval_seconds = interval_seconds
+        self.executor = executor
+        self.timeout_seconds = timeout_seconds
+        self.plan: Optional[MatchPlan] = None
+        self.version = 0  # Bumped for every computed plan
+        self._trigger = asyncio.Event()
+        self._refreshing = 0  # Runs for the default strategy in progress
+        self._lock = threading.Lock()  # One matching run at a time
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> bool:
+        """Whether data may have changed since the cached plan was computed."""
+        return self._trigger.is_set() or self._refreshing > 0
+
+    def trigger(self):
+        """Request a recomputation after the debounce delay; callable from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is None or running is self._loop:
+            self._trigger.set()
+        else:
+            # Commits streamed from a worker thread
+            self._loop.call_soon_threadsafe(self._trigger.set)
+
+    def start(self):
+        # Bind the trigger to the running loop and compute a first plan right away
+        self._loop = asyncio.get_running_loop()
+        self._trigger = asyncio.Event()
+        self._trigger.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._trigger.wait(), timeout=self.interval_seconds)
+                # Let a burst of updates settle before recomputing
+                await asyncio.sleep(self.debounce_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Match scheduler run failed")  # Keep the loop alive
+
+    async def refresh(self, strategy: Optional[str] = None) -> MatchPlan:
+        """Compute a plan now; plans for the default strategy replace the cached one."""
+        strategy = strategy or self.strategy
+        if strategy != self.strategy:
+            return await self._run_compute(strategy)
+        # Changes arriving from here on trigger another run
+        self._trigger.clear()
+        self._refreshing += 1
+        try:
+            return await self._run_compute(strategy)
+        except asyncio.TimeoutError:
+            # Drop the older plan; the timed out run replaces it once it finishes
+            self.plan = None
+            raise
+        finally:
+            self._refreshing -= 1
+
+    async def _run_compute(self, strategy: str) -> MatchPlan:
+        # A run that times out still finishes in the background and caches its plan
+        if self.executor is not None:
+            return await self.executor.run_in_thread(self._compute, strategy, timeout=self.timeout_seconds)
+        return await asyncio.wait_for(asyncio.shield(asyncio.to_thread(self._compute, strategy)), self.timeout_seconds)
+
+    def _compute(self, strategy: str) -> MatchPlan:
+        with self._lock:
+            # Take the dirty marks before reading, so changes committed during the run stay marked for the next one
+            dirty = self.algorithm.take_dirty()
+            db = self.session_factory()
+            try:
+                ngos = db.query(NGO).filter(NGO.is_busy == False).all()
+                crisis_areas = db.query(CrisisArea).all()
+                matches = self.algorithm.find_optimal_matches(ngos, crisis_areas, strategy=strategy, dirty=dirty)
+            except Exception:
+                self.algorithm.restore_dirty(dirty)
+                raise
+            finally:
+                db.close()
+            self.version += 1
+            plan = MatchPlan(
+                version=self.version,
+                strategy=strategy,
+                computed_at=datetime.now(UTC),
+                matches=matches
+            )
+            if strategy == self.strategy:
+                self.plan = plan
+            return plan
+
+    async def take_plan(self, strategy: Optional[str] = None) -> MatchPlan:
+        """Hand out the plan to commit, computing a fresh one if the cached plan is missing or stale.
+
+        The cached plan is consumed, so two commits never share one plan.
+        """
+        strategy = strategy or self.strategy
+        plan = self.plan
+        if plan is None or plan.strategy != strategy or self.pending:
+            plan = await self.refresh(strategy)
+        if self.plan is plan:
+            self.plan = None
+        return plan
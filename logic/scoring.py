@@ -0,0 +1,77 @@
+from typing import Tuple
+import numpy as np
+
+from settings import settings
+from features import CATEGORIES, NGOFeatures, AreaFeatures, category_match_scores
+
+def pair_scores(
+    ngo_features: NGOFeatures,
+    area_features: AreaFeatures,
+    rows: np.ndarray,
+    columns: np.ndarray,
+    distances: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Overall match score of each (NGO row, area column) pair, and whether it would send supplies.
+
+    Vectorized form of AidMatchingAlgorithm.calculate_match_score: the supply
+    score sum, distance factor and reachability factor, weighted by credibility.
+    """
+    supply_total = np.zeros(rows.size)
+    sends = np.zeros(rows.size, dtype=bool)
+    for c in range(len(CATEGORIES)):
+        category_scores = category_match_scores(ngo_features, area_features, rows, columns, c)
+        supply_total += category_scores
+        sends |= category_scores > 0
+
+    distance_factor = 1 - distances / ngo_features.reach_radius_km[rows]
+    scores = (
+        supply_total * settings.MATCHING_WEIGHT_DISTANCE +
+        distance_factor * settings.MATCHING_WEIGHT_INVENTORY +
+        area_features.reachability[columns] * settings.MATCHING_WEIGHT_RESPONSE_TIME
+    ) * ngo_features.credibility[rows]
+    return scores, sends
+
+def score_matrix(
+    ngo_features: NGOFeatures,
+    area_features: AreaFeatures,
+    distances: np.ndarray
+) -> np.ma.MaskedArray:
+    """Overall match score of every NGO (rows) for every crisis area (columns) in one pass.
+
+    `distances` is the full NGO x area distance matrix; entries beyond the NGO's
+    reach radius are masked.
+    """
+    n_ngos, n_areas = distances.shape
+    supply_total = np.zeros((n_ngos, n_areas))
+    for c in range(len(CATEGORIES)):
+        need = area_features.need[:, c]
+        fulfillment = np.divide(
+            ngo_features.available[:, c, None], need,
+            out=np.zeros((n_ngos, n_areas)), where=need != 0
+        )
+        np.minimum(fulfillment, 1.0, out=fulfillment)
+        fulfillment *= area_features.urgency[:, c]
+        fulfillment *= ngo_features.specialization[:, c, None]
+        supply_total += fulfillment
+
+    radii = ngo_features.reach_radius_km[:, None]
+    scores = supply_total * settings.MATCHING_WEIGHT_DISTANCE
+    scores += (1 - distances / radii) * settings.MATCHING_WEIGHT_INVENTORY
+    scores += area_features.reachability * settings.MATCHING_WEIGHT_RESPONSE_TIME
+    scores *= ngo_features.credibility[:, None]
+    return np.ma.masked_array(scores, mask=distances > radii)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first, equal scores in position order.
+
+    A partial selection finds the k-th best score in linear time, so only the
+    candidates at least that good are sorted.
+    """
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if scores.size > k:
+        threshold = np.partition(scores, scores.size - k)[scores.size - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
@@ -2,15 +2,23 @@ from datetime import datetime, timedelta
 import uuid
 
 from db import SessionLocal
-from models.database import NGO, CrisisArea, Donation, User
+from models.database import NGO, CrisisArea, Donation, TravelCost, User
 from models.types import SupplyCategory, ReachabilityLevel, SecurityLevel, DonationStatus
 
+def _expires_in(days: int) -> str:
+    """Expiry date days from now, so demo lots are not already expired when seeded."""
+    return (datetime.utcnow() + timedelta(days=days)).replace(hour=23, minute=59, second=59, microsecond=0).isoformat()
+
 def seed_database():
     """Seed the database with initial data."""
     db = SessionLocal()
     try:
-        # Clear existing data
+        # Databases created before the travel_costs table have no migration for it
+        TravelCost.__table__.create(bind=db.get_bind(), checkfirst=True)
+
+        # Clear existing data, rows referencing NGOs and crisis areas first
         db.query(Donation).delete()
+        db.query(TravelCost).delete()
         db.query(NGO).delete()
         db.query(CrisisArea).delete()
         db.query(User).delete()
@@ -41,14 +49,14 @@ def seed_database():
                 reach_radius_km=1000.0,
                 inventory={
                     SupplyCategory.FOOD.value: [
-                        {"category": SupplyCategory.FOOD.value, "quantity": 1000, "unit": "kg", "expiry_date": "2024-12-31T23:59:59"},
-                        {"category": SupplyCategory.FOOD.value, "quantity": 500, "unit": "kg", "expiry_date": "2024-06-30T23:59:59"}
+                        {"category": SupplyCategory.FOOD.value, "quantity": 1000, "unit": "kg", "expiry_date": _expires_in(90)},
+                        {"category": SupplyCategory.FOOD.value, "quantity": 500, "unit": "kg", "expiry_date": _expires_in(30)}
                     ],
                     SupplyCategory.WATER.value: [
                         {"category": SupplyCategory.WATER.value, "quantity": 5000, "unit": "liters", "expiry_date": None}
                     ],
                     SupplyCategory.MEDICAL.value: [
-                        {"category": SupplyCategory.MEDICAL.value, "quantity": 200, "unit": "boxes", "expiry_date": "2025-01-01T23:59:59"}
+                        {"category": SupplyCategory.MEDICAL.value, "quantity": 200, "unit": "boxes", "expiry_date": _expires_in(120)}
                     ]
                 },
                 replenishment_time_hours={
@@ -79,8 +87,8 @@ def seed_database():
                 reach_radius_km=800.0,
                 inventory={
                     SupplyCategory.MEDICAL.value: [
-                        {"category": SupplyCategory.MEDICAL.value, "quantity": 1000, "unit": "boxes", "expiry_date": "2024-12-31T23:59:59"},
-                        {"category": SupplyCategory.MEDICAL.value, "quantity": 500, "unit": "boxes", "expiry_date": "2024-06-30T23:59:59"}
+                        {"category": SupplyCategory.MEDICAL.value, "quantity": 1000, "unit": "boxes", "expiry_date": _expires_in(90)},
+                        {"category": SupplyCategory.MEDICAL.value, "quantity": 500, "unit": "boxes", "expiry_date": _expires_in(30)}
                     ],
                     SupplyCategory.HYGIENE.value: [
                         {"category": SupplyCategory.HYGIENE.value, "quantity": 2000, "unit": "kits", "expiry_date": None}
@@ -122,7 +130,7 @@ def seed_database():
                 population=50000,
                 current_inventory={
                     SupplyCategory.MEDICAL.value: [
-                        {"category": SupplyCategory.MEDICAL.value, "quantity": 100, "unit": "boxes", "expiry_date": "2024-03-01T23:59:59"}
+                        {"category": SupplyCategory.MEDICAL.value, "quantity": 100, "unit": "boxes", "expiry_date": _expires_in(14)}
                     ],
                     SupplyCategory.WATER.value: [
                         {"category": SupplyCategory.WATER.value, "quantity": 1000, "unit": "liters", "expiry_date": None}
@@ -157,7 +165,7 @@ def seed_database():
                 population=75000,
                 current_inventory={
                     SupplyCategory.FOOD.value: [
-                        {"category": SupplyCategory.FOOD.value, "quantity": 500, "unit": "kg", "expiry_date": "2024-02-15T23:59:59"}
+                        {"category": SupplyCategory.FOOD.value, "quantity": 500, "unit": "kg", "expiry_date": _expires_in(7)}
                     ]
                 },
                 road_conditions="Dangerous",
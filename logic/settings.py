@@ -18,6 +18,14 @@ class Settings:
     HEATMAP_RESOLUTION_KM: float = 0.5  # Grid resolution for heatmap
     HEATMAP_MIN_GRID_STEPS: int = 10  # Minimum number of grid steps
     HEATMAP_GRADIENT_STEPS: int = 10  # Number of color steps in gradient
+    HEATMAP_CHUNK_SIZE: int = 1000000  # Grid point x crisis area distances computed per block
+    HEATMAP_TILE_MAX_STEPS: int = 256  # Most grid cells along a tile side, bounding the work of low zoom tiles
+    HEATMAP_TILE_MAX_ZOOM: int = 20
+    HEATMAP_TILE_CACHE_SIZE: int = 4096  # Tiles kept by the tile endpoint
+    HEATMAP_CACHE_SIZE: int = 256  # /heatmap results kept
+    HEATMAP_CACHE_TTL_SECONDS: float = 300.0
+    HEATMAP_CACHE_SNAP_DEG: float = 0.01  # Requested bounds are widened to this grid before lookup
+    HEATMAP_MODE: str = "stencil"  # "stencil" scatters each area into the cells in its radius; "dense" checks every cell against every area
     
     # Color settings for heatmap (RGB values)
     HEATMAP_COLORS: Dict[float, str] = field(default_factory=get_default_heatmap_colors)
@@ -29,6 +37,8 @@ class Settings:
     
     # Database settings
     DATABASE_URL: str = "postgresql://postgres:postgres@db:5432/crisis_aid"
+    ASYNC_DATABASE_URL: str = ""  # Used by request handlers; derived from DATABASE_URL when empty
+    DONATION_COPY_THRESHOLD: int = 5000  # Donation batches this large use COPY on PostgreSQL
     
     # API settings
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -38,13 +48,29 @@ class Settings:
     MATCHING_WEIGHT_INVENTORY: float = 0.3
     MATCHING_WEIGHT_SPECIALIZATION: float = 0.2
     MATCHING_WEIGHT_RESPONSE_TIME: float = 0.2
+    MATCHING_CHUNK_SIZE: int = 4096  # Crisis areas per distance matrix block
+    MATCHING_PROCESSES: int = 4  # Processes' worth of region-partitioned matching tasks on the compute executor; 1 disables
+    MATCHING_PARALLEL_MIN_PAIRS: int = 200000  # Smaller runs are solved in-process
+    ROUTE_HUB_PRECISION: int = 4  # Decimal places at which route waypoints are merged into one hub
+    MATCH_SCHEDULER_STRATEGY: str = "greedy"  # Strategy of the background match plan
+    MATCH_SCHEDULER_DEBOUNCE_SECONDS: float = 2.0  # Wait after a change before recomputing
+    MATCH_SCHEDULER_INTERVAL_SECONDS: float = 300.0  # Recompute at least this often
+    MATCH_CANDIDATES_K: int = 5  # NGOs listed per crisis area by the candidates endpoint
+    
+    # Compute executor settings
+    WORKER_THREADS: int = 4  # Threads for NumPy work and processes for pure-Python work
+    HEATMAP_TIMEOUT_SECONDS: float = 30.0  # Heatmap requests answer 504 after this long
+    MATCH_TIMEOUT_SECONDS: float = 120.0  # Match plan and candidate requests answer 504 after this long
     
     def __post_init__(self):
         # Load environment variables if present
         import os
         self.JWT_SECRET_KEY = os.getenv('SECRET_KEY', self.JWT_SECRET_KEY)
         self.DATABASE_URL = os.getenv('DATABASE_URL', self.DATABASE_URL)
+        self.ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', self.ASYNC_DATABASE_URL)
         self.CORS_ORIGINS = os.getenv('CORS_ORIGINS', self.CORS_ORIGINS)
+        self.MATCHING_PROCESSES = int(os.getenv('MATCHING_PROCESSES', self.MATCHING_PROCESSES))
+        self.WORKER_THREADS = int(os.getenv('WORKER_THREADS', self.WORKER_THREADS))
 
 # Create a global settings instance
 settings = Settings()
@@ -68,7 +94,7 @@ HEATMAP_OPACITY = 0.6           # Default opacity for heatmap overlay
 
 # Performance optimization
 BATCH_SIZE = 100                # Number of records to process in one batch
-WORKER_THREADS = 4              # Number of worker threads for parallel processing
+WORKER_THREADS = settings.WORKER_THREADS  # Number of worker threads for parallel processing
 
 # Security settings
 PASSWORD_MIN_LENGTH = 12       # Minimum password length
@@ -0,0 +1,296 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from datetime import datetime
+import threading
+import numpy as np
+
+from sqlalchemy.orm import Session
+
+from models.database import NGO, CrisisArea
+from models.types import SupplyCategory, SecurityLevel
+from features import (
+    CATEGORIES, REACHABILITY_RANK, SPECIALIZATION_BONUS, NGOFeatures, AreaFeatures, lot_quantity, usable_quantity
+)
+
+# Position of each security level, 0 (safe) to 3 (extreme)
+SECURITY_RANK = {level: rank for rank, level in enumerate(SecurityLevel)}
+
+# CATEGORIES by value, as the JSON columns key them
+CATEGORY_VALUES = [category.value for category in CATEGORIES]
+
+def _category_quantities(lots_by_category: Dict) -> List[float]:
+    return [sum(lot_quantity(lot) for lot in lots_by_category.get(category) or []) for category in CATEGORY_VALUES]
+
+def _ngo_row(ngo: NGO) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "latitude": ngo.latitude,
+        "longitude": ngo.longitude,
+        "busy": bool(ngo.is_busy),
+        "reach_radius_km": ngo.reach_radius_km,
+        "credibility": ngo.credibility_score,
+        # Lots expire while the row sits here; match runs re-sync and catch that
+        "available": [usable_quantity(ngo.inventory.get(category), now) for category in CATEGORY_VALUES],
+        "specialization": [
+            SPECIALIZATION_BONUS if category in ngo.specializations else 1.0 for category in CATEGORY_VALUES
+        ]
+    }
+
+def _area_row(area: CrisisArea) -> Dict[str, Any]:
+    urgency_levels = area.urgency_levels or {}
+    current_needs = area.current_needs
+    return {
+        "latitude": area.latitude,
+        "longitude": area.longitude,
+        "need": [current_needs.get(category, 0) for category in CATEGORY_VALUES],
+        "listed": [category in current_needs for category in CATEGORY_VALUES],
+        "supplied": _category_quantities(area.current_inventory),
+        "urgency": [urgency_levels.get(category, 1) for category in CATEGORY_VALUES],
+        "urgency_total": sum(urgency_levels.values()),
+        "peak_urgency": max(urgency_levels.values()) if urgency_levels else 1,
+        "reachability": REACHABILITY_RANK[area.reachability],
+        "security": SECURITY_RANK[SecurityLevel(area.security_level)]
+    }
+
+# Column dtypes
+NGO_COLUMNS = {
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "busy": np.bool_,
+    "reach_radius_km": np.float64,
+    "credibility": np.float64,
+    "available": np.float64,  # Summed quantity of the unexpired inventory lots
+    "specialization": np.float64  # SPECIALIZATION_BONUS where specialized, else 1.0
+}
+
+AREA_COLUMNS = {
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "need": np.float64,  # current_needs, 0 where absent
+    "listed": np.bool_,  # Whether the category is in current_needs at all
+    "supplied": np.float64,  # Summed current_inventory quantity
+    "urgency": np.float64,  # urgency_levels (1-5), 1 where absent
+    "urgency_total": np.float64,
+    "peak_urgency": np.float64,
+    "reachability": np.int8,  # REACHABILITY_RANK code
+    "security": np.int8  # SECURITY_RANK code
+}
+
+# Columns holding one value per SupplyCategory
+CATEGORY_COLUMNS = {"available", "specialization", "need", "listed", "supplied", "urgency"}
+
+class ColumnTable:
+    """Entities of one type as one NumPy array per column, one row per entity ID."""
+
+    def __init__(self, dtypes: Dict[str, type], row: Callable[[Any], Dict[str, Any]]):
+        self.dtypes = dtypes
+        self._row = row
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.columns: Dict[str, np.ndarray] = self._build([])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def _build(self, values: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        columns = {}
+        for name, dtype in self.dtypes.items():
+            column = np.array([value[name] for value in values], dtype=dtype)
+            if not values and name in CATEGORY_COLUMNS:
+                column = column.reshape(0, len(CATEGORIES))
+            columns[name] = column
+        return columns
+
+    def rebuild(self, entities: Sequence):
+        self.columns = self._build([self._row(entity) for entity in entities])
+        self.ids = [entity.id for entity in entities]
+        self.positions = {entity_id: position for position, entity_id in enumerate(self.ids)}
+
+    def _append(self, entities: Sequence):
+        # Grow the columns before publishing the new IDs, so readers never index past the end
+        appended = self._build([self._row(entity) for entity in entities])
+        self.columns = {
+            name: np.concatenate((column, appended[name])) for name, column in self.columns.items()
+        }
+        for entity in entities:
+            self.ids.append(entity.id)
+            self.positions[entity.id] = len(self.ids) - 1
+
+    def upsert(self, entity):
+        """Rewrite the entity's row in place, or append a row for an unknown entity."""
+        position = self.positions.get(entity.id)
+        if position is None:
+            self._append([entity])
+            return
+        value = self._row(entity)
+        for name, column in self.columns.items():
+            column[position] = value[name]
+
+    def sync(self, entities: Sequence) -> List[str]:
+        """Rewrite the rows of the given entities that differ from them, appending unknown ones.
+
+        Returns the IDs of the rewritten and appended entities.
+        """
+        known = [entity for entity in entities if entity.id in self.positions]
+        unknown = [entity for entity in entities if entity.id not in self.positions]
+        changed_ids = []
+        if known:
+            rows = np.array([self.positions[entity.id] for entity in known], dtype=np.int64)
+            values = self._build([self._row(entity) for entity in known])
+            changed = np.zeros(rows.size, dtype=bool)
+            for name, column in self.columns.items():
+                changed |= (column[rows] != values[name]).reshape(rows.size, -1).any(axis=1)
+            changed_rows = np.flatnonzero(changed)
+            for name, column in self.columns.items():
+                column[rows[changed_rows]] = values[name][changed_rows]
+            changed_ids = [known[row].id for row in changed_rows.tolist()]
+        if unknown:
+            self._append(unknown)
+            changed_ids.extend(entity.id for entity in unknown)
+        return changed_ids
+
+    def rows(self, entity_ids: Sequence[str]) -> Optional[np.ndarray]:
+        """Row of every given ID, or None if any of them is not in the table."""
+        rows = [self.positions.get(entity_id) for entity_id in entity_ids]
+        if any(row is None for row in rows):
+            return None
+        return np.array(rows, dtype=np.int64)
+
+class Snapshot:
+    """Struct-of-arrays copy of every NGO and crisis area, read by the matcher and the heatmap.
+
+    Loaded once from the database, then kept current by applying each changed
+    entity (PATCH updates, reserved inventory), which rewrites only its row.
+    Every change bumps version, so results derived from the arrays can be
+    cached per version.
+
+    Each worker process holds its own snapshot and applies only its own
+    writes. Match runs sync the rows they read from the database first (see
+    features()), which also brings in what other processes changed; between
+    runs the heatmap may lag their writes. The locations of crisis areas
+    changed that way are kept for take_synced_area_locations(), so heatmap
+    caches can drop what they cover.
+    """
+
+    def __init__(self):
+        self.ngos = ColumnTable(NGO_COLUMNS, _ngo_row)
+        self.areas = ColumnTable(AREA_COLUMNS, _area_row)
+        self.version = 0
+        self._lock = threading.Lock()  # Writers only; matching reads from worker threads
+        self._satisfaction: Dict[Optional[SupplyCategory], Tuple[int, np.ndarray]] = {}  # By category: (version, values)
+        self._synced_area_locations: Set[Tuple[float, float]] = set()  # Old and new, since the last take
+
+    def rebuild(self, ngos: Sequence[NGO], crisis_areas: Sequence[CrisisArea]):
+        with self._lock:
+            self.ngos.rebuild(ngos)
+            self.areas.rebuild(crisis_areas)
+            self.version += 1
+
+    def load(self, db: Session):
+        self.rebuild(db.query(NGO).all(), db.query(CrisisArea).all())
+
+    def update_ngos(self, ngos: Sequence[NGO]):
+        with self._lock:
+            for ngo in ngos:
+                self.ngos.upsert(ngo)
+            self.version += 1
+
+    def update_crisis_areas(self, crisis_areas: Sequence[CrisisArea]):
+        with self._lock:
+            for area in crisis_areas:
+                self.areas.upsert(area)
+            self.version += 1
+
+    def features(
+        self,
+        ngos: Sequence[NGO],
+        crisis_areas: Sequence[CrisisArea]
+    ) -> Tuple[NGOFeatures, AreaFeatures, List[str], List[str]]:
+        """Matcher arrays for exactly these NGO and crisis area rows, and the IDs whose rows changed.
+
+        The rows are applied first, so the features always agree with the rows
+        being allocated even where this process's arrays were behind, and are
+        gathered before another write can land. Changed rows are ones written
+        without passing through this snapshot, such as by another process.
+        """
+        with self._lock:
+            changed_ngos = self.ngos.sync(ngos)
+            previous = (self.areas["latitude"].copy(), self.areas["longitude"].copy())
+            changed_areas = self.areas.sync(crisis_areas)
+            if changed_ngos or changed_areas:
+                self.version += 1
+            if changed_areas:
+                rows = self.areas.rows(changed_areas)
+                for latitudes, longitudes in (previous, (self.areas["latitude"], self.areas["longitude"])):
+                    known = rows[rows < latitudes.size]  # Appended rows have no previous location
+                    self._synced_area_locations.update(zip(latitudes[known].tolist(), longitudes[known].tolist()))
+            return self.ngo_features(ngos), self.area_features(crisis_areas), changed_ngos, changed_areas
+
+    def take_synced_area_locations(self) -> Set[Tuple[float, float]]:
+        """Old and new locations of the crisis areas features() found changed since the last call."""
+        with self._lock:
+            locations, self._synced_area_locations = self._synced_area_locations, set()
+            return locations
+
+    def ngo_features(self, ngos: Sequence[NGO]) -> NGOFeatures:
+        """Matcher arrays for the given NGOs, gathered from their rows."""
+        rows = self.ngos.rows([ngo.id for ngo in ngos])
+        if rows is None:
+            return NGOFeatures.from_ngos(ngos)  # Not loaded through the snapshot
+        return NGOFeatures(
+            available=self.ngos["available"][rows],
+            specialization=self.ngos["specialization"][rows],
+            reach_radius_km=self.ngos["reach_radius_km"][rows],
+            credibility=self.ngos["credibility"][rows]
+        )
+
+    def area_features(self, crisis_areas: Sequence[CrisisArea]) -> AreaFeatures:
+        """Matcher arrays for the given crisis areas, gathered from their rows."""
+        columns = self.areas.rows([area.id for area in crisis_areas])
+        if columns is None:
+            return AreaFeatures.from_crisis_areas(crisis_areas)
+        return AreaFeatures(
+            need=self.areas["need"][columns],
+            urgency=self.areas["urgency"][columns] / 5,
+            reachability=1 - self.areas["reachability"][columns] / 4
+        )
+
+    def areas_within(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Rows of the crisis areas inside a latitude/longitude box."""
+        latitude, longitude = self.areas["latitude"], self.areas["longitude"]
+        return np.flatnonzero(
+            (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+        )
+
+    def satisfaction(self, rows: np.ndarray, category: Optional[SupplyCategory] = None) -> np.ndarray:
+        """How well each crisis area's needs are met, 0 (not at all) to 1 (fully).
+
+        For one category this is supplied / needed, capped at 1 and 1 without a
+        need; overall it is the urgency-weighted average over the listed needs.
+        """
+        need = self.areas["need"][rows]
+        met = np.divide(
+            self.areas["supplied"][rows], need,
+            out=np.ones(need.shape), where=need != 0
+        )
+        np.minimum(met, 1.0, out=met)
+        if category is not None:
+            return met[:, CATEGORIES.index(category)]
+
+        total = self.areas["urgency_total"][rows]
+        weights = np.where(self.areas["listed"][rows], self.areas["urgency"][rows], 0.0)
+        weighted = (met * weights).sum(axis=1)
+        return np.divide(weighted, total, out=np.ones(total.size), where=total != 0)
+    
+    def area_satisfaction(self, category: Optional[SupplyCategory] = None) -> np.ndarray:
+        """satisfaction() of every crisis area, computed once per version and category."""
+        version = self.version
+        cached = self._satisfaction.get(category)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # Tagged with the version read first, so values racing a write are recomputed next time
+        values = self.satisfaction(np.arange(len(self.areas)), category)
+        self._satisfaction[category] = (version, values)
+        return values
@@ -0,0 +1,127 @@
+from typing import List, Tuple
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, Coordinates, haversine_pairs
+
+# Offsets of a voxel and its 26 neighbours
+_NEIGHBOUR_OFFSETS = np.array(
+    [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+    dtype=np.int64
+)
+
+def unit_vectors(latitudes: Coordinates, longitudes: Coordinates) -> np.ndarray:
+    """Convert latitude/longitude degrees to points on the unit sphere, one row per point."""
+    phi = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lmb = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_phi = np.cos(phi)
+    return np.stack((cos_phi * np.cos(lmb), cos_phi * np.sin(lmb), np.sin(phi)), axis=-1)
+
+class _RadiusBucket:
+    """Voxel grid over the points whose radius falls in one power-of-two band."""
+
+    def __init__(self, members: np.ndarray, vectors: np.ndarray, max_radius_km: float):
+        # A chord is never longer than its arc, so with voxels one arc-radius wide
+        # every point within reach lies in the query's voxel or one of its neighbours
+        self.cell_size = min(max(max_radius_km, 1e-3) / EARTH_RADIUS_KM, 2.0)
+        self.cells_per_axis = int(np.ceil(2.0 / self.cell_size)) + 3
+
+        keys = self._keys(self._cells(vectors[members]))
+        order = np.argsort(keys, kind="stable")
+        self.members = members[order]
+        self.keys = keys[order]
+
+    def _cells(self, vectors: np.ndarray) -> np.ndarray:
+        return np.floor((vectors + 1.0) / self.cell_size).astype(np.int64) + 1
+
+    def _keys(self, cells: np.ndarray) -> np.ndarray:
+        n = self.cells_per_axis
+        return (cells[:, 0] * n + cells[:, 1]) * n + cells[:, 2]
+
+    def candidates(self, query_vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(member, query) index pairs sharing or neighbouring a voxel."""
+        query_cells = self._cells(query_vectors)
+        members, queries = [], []
+        for offset in _NEIGHBOUR_OFFSETS:
+            keys = self._keys(query_cells + offset)
+            lo = np.searchsorted(self.keys, keys, side="left")
+            hi = np.searchsorted(self.keys, keys, side="right")
+            counts = hi - lo
+            hits = np.flatnonzero(counts)
+            if hits.size == 0:
+                continue
+            counts = counts[hits]
+            # Expand each [lo, hi) range into explicit member positions
+            starts = np.repeat(lo[hits] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+            members.append(self.members[starts + np.arange(counts.sum())])
+            queries.append(np.repeat(hits, counts))
+        if not members:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(members), np.concatenate(queries)
+
+class SpatialIndex:
+    """Radius index over points that each reach a different distance, e.g. NGO locations.
+
+    Points live on a voxel grid over their unit-sphere coordinates, which avoids
+    special cases at the poles and the antimeridian. Each power-of-two band of
+    reach radii gets its own grid sized to the band's largest radius, so small
+    radii are not penalized by the largest one.
+    """
+
+    def __init__(self, latitudes: Coordinates, longitudes: Coordinates, radii_km: Coordinates):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.radii_km = np.asarray(radii_km, dtype=np.float64)
+        vectors = unit_vectors(self.latitudes, self.longitudes)
+
+        self.buckets: List[_RadiusBucket] = []
+        reachable = np.flatnonzero(self.radii_km >= 0)
+        if reachable.size == 0:
+            return
+        bands = np.ceil(np.log2(np.maximum(self.radii_km[reachable], 1e-3))).astype(np.int64)
+        for band in np.unique(bands):
+            members = reachable[bands == band]
+            self.buckets.append(_RadiusBucket(members, vectors, float(self.radii_km[members].max())))
+
+    def __len__(self) -> int:
+        return self.radii_km.size
+
+    def query_pairs(
+        self,
+        latitudes: Coordinates,
+        longitudes: Coordinates
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every (point, query) pair where the query location lies within the point's radius.
+
+        Returns point indices, query indices and distances in kilometers, sorted by
+        query and then by point.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        query_vectors = unit_vectors(latitudes, longitudes)
+
+        points, queries = [], []
+        for bucket in self.buckets:
+            bucket_points, bucket_queries = bucket.candidates(query_vectors)
+            points.append(bucket_points)
+            queries.append(bucket_queries)
+        if not points:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        points = np.concatenate(points)
+        queries = np.concatenate(queries)
+
+        distances = haversine_pairs(
+            self.latitudes[points], self.longitudes[points],
+            latitudes[queries], longitudes[queries]
+        )
+        within = distances <= self.radii_km[points]
+        points, queries, distances = points[within], queries[within], distances[within]
+
+        order = np.lexsort((points, queries))
+        return points[order], queries[order], distances[order]
+
+    def query(self, latitude: float, longitude: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of the points that reach a single location, with their distances."""
+        points, _, distances = self.query_pairs([latitude], [longitude])
+        return points, distances
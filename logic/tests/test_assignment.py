@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from assignment import auction_assignment
+
+def _random_edges(n_rows: int, n_cols: int, density: float, seed: int):
+    """Sparse edges with some non-positive benefits mixed in."""
+    rng = np.random.default_rng(seed)
+    present = rng.random((n_rows, n_cols)) < density
+    rows, cols = np.nonzero(present)
+    benefits = rng.uniform(-0.2, 1.0, rows.size)
+    return rows, cols, benefits
+
+def _optimum(rows, cols, benefits, n_rows: int, n_cols: int) -> float:
+    # Missing and non-positive edges are worth 0, the same as leaving both ends unassigned
+    matrix = np.zeros((n_rows, n_cols))
+    matrix[rows, cols] = np.maximum(benefits, 0.0)
+    chosen_rows, chosen_cols = linear_sum_assignment(matrix, maximize=True)
+    return float(matrix[chosen_rows, chosen_cols].sum())
+
+def _total(assignment, rows, cols, benefits) -> float:
+    """Total benefit of an assignment, checking it only uses positive edges and each column once."""
+    edges = {(row, col): benefit for row, col, benefit in zip(rows.tolist(), cols.tolist(), benefits.tolist())}
+    assigned = [(row, col) for row, col in enumerate(assignment.tolist()) if col >= 0]
+    assert len({col for _, col in assigned}) == len(assigned)
+    assert all(edges.get(edge, 0.0) > 0 for edge in assigned)
+    return sum(edges[edge] for edge in assigned)
+
+@pytest.mark.parametrize("n_rows, n_cols", [(1, 1), (6, 6), (12, 5), (5, 12), (30, 40)])
+@pytest.mark.parametrize("density", [0.3, 1.0])
+@pytest.mark.parametrize("seed", range(3))
+def test_within_epsilon_of_linear_sum_assignment(n_rows, n_cols, density, seed):
+    rows, cols, benefits = _random_edges(n_rows, n_cols, density, seed)
+    epsilon = 1e-3
+    assignment = auction_assignment(rows, cols, benefits, n_rows, n_cols, epsilon=epsilon)
+    assert assignment.shape == (n_rows,)
+    total = _total(assignment, rows, cols, benefits)
+    optimum = _optimum(rows, cols, benefits, n_rows, n_cols)
+    assert optimum - (n_rows + n_cols) * epsilon - 1e-9 <= total <= optimum + 1e-9
+
+def test_default_epsilon_stays_within_its_bound():
+    n_rows, n_cols = 25, 15
+    rows, cols, benefits = _random_edges(n_rows, n_cols, 0.5, seed=7)
+    assignment = auction_assignment(rows, cols, benefits, n_rows, n_cols)
+    # Default epsilon is max benefit / (10 * entities with edges), so at most a tenth of the max is lost
+    bound = benefits.max() / 10
+    assert _total(assignment, rows, cols, benefits) >= _optimum(rows, cols, benefits, n_rows, n_cols) - bound - 1e-9
+
+def test_all_infeasible_leaves_everything_unassigned():
+    rows, cols = np.nonzero(np.ones((4, 3), dtype=bool))
+    benefits = -np.arange(rows.size, dtype=np.float64)
+    assert (auction_assignment(rows, cols, benefits, 4, 3) == -1).all()
+
+def test_no_edges():
+    empty = np.zeros(0, dtype=np.int64)
+    assert (auction_assignment(empty, empty, np.zeros(0), 3, 2) == -1).all()
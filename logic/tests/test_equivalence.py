@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from geo import haversine_km, haversine_matrix, haversine_pairs
+
+TOLERANCE_KM = 1e-9
+
+# (lat1, lon1, lat2, lon2): poles, the antimeridian and identical points
+EDGE_CASES = [
+    (90.0, 0.0, 89.5, 120.0),
+    (-90.0, 45.0, -89.0, -135.0),
+    (90.0, 0.0, 90.0, 180.0),
+    (0.0, 179.9, 0.0, -179.9),
+    (10.0, -180.0, 10.0, 180.0),
+    (-33.5, 179.999, -33.4, -179.999),
+    (48.85, 2.35, 48.85, 2.35),
+    (0.0, 0.0, 0.0, 0.0),
+    (-90.0, 0.0, -90.0, 0.0)
+]
+
+def _random_points(size: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-90, 90, size), rng.uniform(-180, 180, size)
+
+def _scalar_matrix(lat1, lon1, lat2, lon2) -> np.ndarray:
+    return np.array([
+        [haversine_km(a, b, c, d) for c, d in zip(lat2.tolist(), lon2.tolist())]
+        for a, b in zip(lat1.tolist(), lon1.tolist())
+    ])
+
+def test_haversine_matrix_matches_scalar_on_random_points():
+    lat1, lon1 = _random_points(60, seed=0)
+    lat2, lon2 = _random_points(80, seed=1)
+    expected = _scalar_matrix(lat1, lon1, lat2, lon2)
+    assert np.abs(haversine_matrix(lat1, lon1, lat2, lon2) - expected).max() <= TOLERANCE_KM
+
+def test_haversine_pairs_matches_scalar_on_random_points():
+    lat1, lon1 = _random_points(500, seed=2)
+    lat2, lon2 = _random_points(500, seed=3)
+    expected = np.array([haversine_km(*point) for point in zip(lat1, lon1, lat2, lon2)])
+    assert np.abs(haversine_pairs(lat1, lon1, lat2, lon2) - expected).max() <= TOLERANCE_KM
+
+@pytest.mark.parametrize("lat1, lon1, lat2, lon2", EDGE_CASES)
+def test_haversine_kernels_match_scalar_on_edge_cases(lat1, lon1, lat2, lon2):
+    expected = haversine_km(lat1, lon1, lat2, lon2)
+    assert abs(haversine_matrix([lat1], [lon1], [lat2], [lon2])[0, 0] - expected) <= TOLERANCE_KM
+    assert abs(haversine_pairs([lat1], [lon1], [lat2], [lon2])[0] - expected) <= TOLERANCE_KM
+
+def test_identical_points_are_zero_apart():
+    lat, lon = _random_points(50, seed=4)
+    assert np.abs(np.diag(haversine_matrix(lat, lon, lat, lon))).max() <= TOLERANCE_KM
+    assert np.abs(haversine_pairs(lat, lon, lat, lon)).max() <= TOLERANCE_KM
+
+def test_pair_scores_match_reference_scoring():
+    from benchmarks.equivalence import check
+
+    assert check(n_ngos=60, n_crisis_areas=240, seed=0, tolerance=1e-9)
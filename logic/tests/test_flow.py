@@ -0,0 +1,48 @@
+from collections import defaultdict
+import numpy as np
+
+from flow import max_weight_transportation
+from algorithm import AidMatchingAlgorithm
+from features import lot_quantity
+from benchmarks.synthetic import generate_instance
+
+def test_hand_solved_transportation_instance():
+    # Sink 0 prefers source 0 (3 per unit over 2), so source 0 fills it and sends its
+    # last unit to sink 1, which source 1 tops up: 4*3 + 1*1 + 3*2 = 19
+    supply = np.array([5, 3])
+    demand = np.array([4, 4, 6])
+    sources = np.array([0, 0, 1, 1, 1, 0])
+    sinks = np.array([0, 1, 0, 1, 2, 2])
+    weights = np.array([3.0, 1.0, 2.0, 2.0, -1.0, 0.0])
+
+    flows = max_weight_transportation(supply, demand, sources, sinks, weights)
+    assert flows.tolist() == [4, 1, 0, 3, 0, 0]
+    assert float(weights @ flows) == 19.0
+
+def test_flow_stops_when_it_no_longer_adds_weight():
+    # Neither side has to be exhausted
+    flows = max_weight_transportation(np.array([10]), np.array([3, 5]), np.array([0, 0]), np.array([0, 1]), np.array([1.0, 0.0]))
+    assert flows.tolist() == [3, 0]
+
+def test_no_usable_edges():
+    flows = max_weight_transportation(np.array([0, 2]), np.array([1]), np.array([0, 1]), np.array([0, 0]), np.array([1.0, -1.0]))
+    assert flows.tolist() == [0, 0]
+
+def test_split_matching_stays_within_supply_and_need():
+    ngos, crisis_areas = generate_instance(60, 200, seed=3)
+    matches = AidMatchingAlgorithm().find_optimal_matches(ngos, crisis_areas, strategy="split")
+    assert matches
+
+    sent_by_ngo = defaultdict(int)
+    sent_to_area = defaultdict(int)
+    for ngo, area, supplies in matches:
+        for supply in supplies:
+            sent_by_ngo[(ngo.id, supply.category.value)] += supply.quantity
+            sent_to_area[(area.id, supply.category.value)] += supply.quantity
+
+    ngos_by_id = {ngo.id: ngo for ngo in ngos}
+    areas_by_id = {area.id: area for area in crisis_areas}
+    for (ngo_id, category), quantity in sent_by_ngo.items():
+        assert quantity <= sum(lot_quantity(lot) for lot in ngos_by_id[ngo_id].inventory.get(category, []))
+    for (area_id, category), quantity in sent_to_area.items():
+        assert quantity <= areas_by_id[area_id].current_needs.get(category, 0)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from heatmap import HeatmapGenerator
+from models.types import Location, SupplyCategory
+from settings import settings
+from snapshot import Snapshot
+from benchmarks.synthetic import generate_instance
+
+def _snapshot(center_latitude, center_longitude, seed):
+    # Tightly clustered, so areas' 2 km radii overlap
+    _, crisis_areas = generate_instance(0, 150, seed=seed, n_regions=1, region_spread_deg=0.02)
+    latitude = np.mean([area.latitude for area in crisis_areas])
+    longitude = np.mean([area.longitude for area in crisis_areas])
+    rng = np.random.default_rng(seed)
+    for area in crisis_areas:
+        area.latitude = min(90.0, area.latitude - latitude + center_latitude)
+        area.longitude = area.longitude - longitude + center_longitude
+        # Partly supplied, so satisfaction varies from area to area
+        area.current_inventory = {
+            category: [{"category": category, "quantity": float(need * rng.uniform(0, 1.2)), "unit": "units"}]
+            for category, need in area.current_needs.items()
+        }
+    snapshot = Snapshot()
+    snapshot.rebuild([], crisis_areas)
+    return snapshot
+
+def _points(generator, mode, snapshot, bounds, category):
+    generator.mode = mode
+    points = generator.generate_heatmap_data(snapshot, bounds, category)["points"]
+    return {(point["lat"], point["lng"]): (point["intensity"], point["satisfaction"]) for point in points}
+
+@pytest.mark.parametrize("center", [(12.5, 40.0), (-48.0, -120.0), (89.985, 10.0)])
+@pytest.mark.parametrize("category", [None, SupplyCategory.WATER])
+def test_stencil_and_dense_heatmaps_agree(monkeypatch, center, category):
+    # Small blocks, so the stencil path spreads the areas over many of them
+    monkeypatch.setattr(settings, "HEATMAP_CHUNK_SIZE", 500)
+    snapshot = _snapshot(*center, seed=3)
+    latitude, longitude = center
+    bounds = (
+        Location(latitude=max(-90.0, latitude - 0.06), longitude=longitude - 0.06),
+        Location(latitude=min(90.0, latitude + 0.06), longitude=longitude + 0.06)
+    )
+    generator = HeatmapGenerator()
+
+    dense = _points(generator, "dense", snapshot, bounds, category)
+    stencil = _points(generator, "stencil", snapshot, bounds, category)
+    assert len(dense) > 50
+    assert stencil.keys() == dense.keys()
+    for cell, (intensity, satisfaction) in dense.items():
+        assert stencil[cell] == pytest.approx((intensity, satisfaction), abs=1e-9)
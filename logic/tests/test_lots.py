@@ -0,0 +1,53 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from lots import LotIndex
+from models.types import SupplyCategory
+
+AS_OF = datetime(2026, 6, 1)
+
+def _lot(quantity, expiry=None):
+    return {"category": "food", "quantity": quantity, "unit": "kg", "expiry_date": expiry}
+
+def _index(*lots):
+    return LotIndex([SimpleNamespace(id="ngo0", inventory={"food": list(lots)})], as_of=AS_OF)
+
+def _taken(supplies):
+    return [(supply.quantity, supply.expiry_date) for supply in supplies]
+
+def test_earliest_expiring_lots_are_consumed_first():
+    index = _index(
+        _lot(10),
+        _lot(10, "2026-09-01T00:00:00"),
+        _lot(10, "2026-07-01T00:00:00"),
+        _lot(10, "2026-08-01T00:00:00"),
+    )
+    taken = _taken(index.allocate(0, SupplyCategory.FOOD, 40))
+    assert taken == [
+        (10, datetime(2026, 7, 1)),
+        (10, datetime(2026, 8, 1)),
+        (10, datetime(2026, 9, 1)),
+        (10, None),
+    ]
+
+def test_expired_lots_are_skipped():
+    index = _index(
+        _lot(50, "2026-05-31T23:59:59"),
+        _lot(5, "2026-07-01T00:00:00"),
+        _lot(5, "2026-01-01T00:00:00+00:00"),
+    )
+    assert _taken(index.allocate(0, SupplyCategory.FOOD, 20)) == [(5, datetime(2026, 7, 1))]
+    assert index.allocate(0, SupplyCategory.FOOD, 1) == []
+
+def test_partial_allocations_keep_the_heap_consistent():
+    index = _index(_lot(10, "2026-08-01T00:00:00"), _lot(10, "2026-07-01T00:00:00"), _lot(0, "2026-06-15T00:00:00"))
+
+    assert _taken(index.allocate(0, SupplyCategory.FOOD, 4)) == [(4, datetime(2026, 7, 1))]
+    assert _taken(index.allocate(0, SupplyCategory.FOOD, 4)) == [(4, datetime(2026, 7, 1))]
+    # The rest of the first lot, then into the next one
+    assert _taken(index.allocate(0, SupplyCategory.FOOD, 5)) == [(2, datetime(2026, 7, 1)), (3, datetime(2026, 8, 1))]
+    assert [entry[2] for entry in index._heaps[(0, "food")]] == [7]
+    assert _taken(index.allocate(0, SupplyCategory.FOOD, 100)) == [(7, datetime(2026, 8, 1))]
+    assert index._heaps[(0, "food")] == []
+    # The stored inventory is left alone
+    assert [lot["quantity"] for lot in index.ngos[0].inventory["food"]] == [10, 10, 0]
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+import numpy as np
+
+from matching_state import MatchingState
+from algorithm import AidMatchingAlgorithm
+from snapshot import Snapshot
+from benchmarks.synthetic import generate_instance
+
+def _entities(prefix: str, count: int):
+    return [SimpleNamespace(id=f"{prefix}{i}") for i in range(count)]
+
+def _all_pairs(ngos, crisis_areas):
+    rows, columns = np.divmod(np.arange(len(ngos) * len(crisis_areas)), len(crisis_areas))
+    return rows, columns, np.zeros(rows.size)
+
+def _score(ngos, crisis_areas, rows, columns, distances):
+    return np.ones(rows.size), np.ones(rows.size, dtype=bool)
+
+def test_entity_marked_during_refresh_stays_dirty():
+    state = MatchingState()
+    ngos, areas = _entities("ngo", 3), _entities("area", 4)
+    state.refresh(ngos, areas, _all_pairs, _score)
+
+    state.mark_ngo_dirty("ngo0")
+    dirty = state.take_dirty()
+
+    def find_pairs(batch_ngos, batch_areas):
+        # A PATCH lands while the run is computing
+        state.mark_ngo_dirty("ngo1")
+        state.mark_crisis_area_dirty("area2")
+        return _all_pairs(batch_ngos, batch_areas)
+
+    state.refresh(ngos, areas, find_pairs, _score, dirty)
+    assert state.recomputed_pairs == len(areas)
+    assert state.dirty_ngos == {"ngo1"}
+    assert state.dirty_areas == {"area2"}
+
+    # The next run picks the late marks up
+    state.refresh(ngos, areas, _all_pairs, _score)
+    assert state.recomputed_pairs == len(areas) + len(ngos) - 1
+    assert not state.dirty_ngos and not state.dirty_areas
+
+def test_failed_refresh_keeps_its_marks():
+    state = MatchingState()
+    ngos, areas = _entities("ngo", 2), _entities("area", 2)
+    state.refresh(ngos, areas, _all_pairs, _score)
+    state.mark_crisis_area_dirty("area1")
+
+    def failing_pairs(batch_ngos, batch_areas):
+        raise RuntimeError("lost connection")
+
+    try:
+        state.refresh(ngos, areas, failing_pairs, _score)
+    except RuntimeError:
+        pass
+    assert state.dirty_areas == {"area1"}
+
+def test_ngo_moved_after_the_run_read_it_is_rescored_next_run():
+    ngos, crisis_areas = generate_instance(20, 60, seed=0)
+    algorithm = AidMatchingAlgorithm(incremental=True)
+    algorithm.find_optimal_matches(ngos, crisis_areas)
+
+    # A run takes the marks and reads the NGOs; the same rows, read again
+    algorithm.mark_crisis_area_dirty(crisis_areas[1].id)
+    dirty = algorithm.take_dirty()
+    read_ngos, _ = generate_instance(20, 60, seed=0)
+
+    # A PATCH moves an NGO after the read but before the run scores its pairs
+    moved = ngos[0]
+    moved.latitude, moved.longitude = crisis_areas[0].latitude, crisis_areas[0].longitude
+    algorithm.mark_ngo_dirty(moved.id)
+
+    algorithm.find_optimal_matches(read_ngos, crisis_areas, dirty=dirty)
+    assert algorithm.matching_state.dirty_ngos == {moved.id}
+
+    algorithm.find_optimal_matches(ngos, crisis_areas)
+    state = algorithm.matching_state
+    assert not state.dirty_ngos
+    rows, columns, _ = AidMatchingAlgorithm().find_reachable_pairs(ngos, crisis_areas)
+    expected = {(ngos[row].id, crisis_areas[column].id) for row, column in zip(rows.tolist(), columns.tolist())}
+    cached = {
+        (state.ngo_ids[row], state.area_ids[column])
+        for row, column in zip(state.pair_ngos.tolist(), state.pair_areas.tolist())
+    }
+    assert cached == expected
+    assert (moved.id, crisis_areas[0].id) in cached
+
+def _match_summary(matches):
+    return sorted(
+        (ngo.id, area.id, sorted((supply.category, supply.quantity) for supply in supplies))
+        for ngo, area, supplies in matches
+    )
+
+def test_rows_changed_outside_this_process_are_rescored():
+    ngos, crisis_areas = generate_instance(40, 120, seed=2)
+    snapshot = Snapshot()
+    snapshot.rebuild(ngos, crisis_areas)
+    algorithm = AidMatchingAlgorithm(incremental=True, snapshot=snapshot)
+    matches = algorithm.find_optimal_matches(ngos, crisis_areas)
+    assert matches
+
+    # Another worker drains the matched NGOs; nothing is marked dirty here
+    for ngo, _, _ in matches:
+        ngo.inventory = {}
+    dirty = algorithm.take_dirty()
+    rerun = algorithm.find_optimal_matches(ngos, crisis_areas, dirty=dirty)
+
+    assert all(supplies for _, _, supplies in rerun)
+    assert _match_summary(rerun) == _match_summary(AidMatchingAlgorithm().find_optimal_matches(ngos, crisis_areas))
+    assert not algorithm.matching_state.dirty_ngos
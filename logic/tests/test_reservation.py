@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from models.database import NGO, CrisisArea
+from models.types import Supply, SupplyCategory, ReachabilityLevel, SecurityLevel
+from reservation import reserve_inventory
+
+EARLY = "2025-03-01T00:00:00"
+LATE = "2025-09-01T00:00:00"
+
+def _ngo(ngo_id: str, inventory: dict) -> NGO:
+    return NGO(
+        id=ngo_id, name=ngo_id, is_busy=False, working_hours={}, latitude=0.0, longitude=0.0,
+        reach_radius_km=100.0, inventory=inventory, replenishment_time_hours={}, specializations=[]
+    )
+
+def _area(area_id: str) -> CrisisArea:
+    return CrisisArea(
+        id=area_id, name=area_id, latitude=0.1, longitude=0.1, current_needs={"food": 1000},
+        reachability=ReachabilityLevel.EASY, weather_conditions="clear", urgency_levels={"food": 3},
+        population=1000, current_inventory={}, road_conditions="good", security_level=SecurityLevel.SAFE,
+        nearest_supply_routes=[]
+    )
+
+def _food(quantity: int, expiry: str = None) -> Supply:
+    return Supply(
+        category=SupplyCategory.FOOD, quantity=quantity, unit="kg",
+        expiry_date=datetime.fromisoformat(expiry) if expiry else None
+    )
+
+def _lot(quantity: int, expiry: str = None) -> dict:
+    return {"category": "food", "quantity": quantity, "unit": "kg", "expiry_date": expiry}
+
+def _setup(db, inventory: dict, n_areas: int = 1):
+    ngo = _ngo("ngo", inventory)
+    areas = [_area(f"area{i}") for i in range(n_areas)]
+    db.add_all([ngo, *areas])
+    db.commit()
+    return ngo, areas
+
+def _food_lots(db) -> list:
+    db.expire_all()
+    return db.get(NGO, "ngo").inventory["food"]
+
+def test_lot_quantities_are_decremented(db):
+    ngo, (area,) = _setup(db, {"food": [_lot(100, EARLY), _lot(300, LATE)]})
+    reserved = reserve_inventory(db, [(ngo, area, [_food(100, EARLY), _food(50, LATE)])])
+    db.commit()
+
+    assert reserved == [0]
+    # The emptied lot is dropped, the other one keeps the rest
+    assert _food_lots(db) == [_lot(250, LATE)]
+
+def test_match_no_longer_covered_is_skipped(db):
+    ngo, (area,) = _setup(db, {"food": [_lot(100, EARLY)]})
+    # Another commit drew from the lot after the match was planned
+    ngo.inventory = {"food": [_lot(40, EARLY)]}
+    db.commit()
+
+    reserved = reserve_inventory(db, [(ngo, area, [_food(100, EARLY)])])
+    db.commit()
+    assert reserved == []
+    assert _food_lots(db) == [_lot(40, EARLY)]
+
+def test_split_matches_on_one_ngo_do_not_oversubscribe_it(db):
+    ngo, areas = _setup(db, {"food": [_lot(100, EARLY), _lot(100, LATE)]}, n_areas=4)
+    matches = [
+        (ngo, areas[0], [_food(60, EARLY)]),
+        (ngo, areas[1], [_food(60, EARLY)]),  # Only 40 left in the early lot
+        (ngo, areas[2], [_food(40, EARLY), _food(30, LATE)]),
+        (ngo, areas[3], [_food(80, LATE)])  # Only 70 left in the late lot
+    ]
+    reserved = reserve_inventory(db, matches)
+    db.commit()
+
+    assert reserved == [0, 2]
+    assert _food_lots(db) == [_lot(70, LATE)]
+    sent = sum(supply.quantity for position in reserved for supply in matches[position][2])
+    assert sent == 200 - 70
+
+def test_busy_ngo_is_not_reserved(db):
+    ngo, (area,) = _setup(db, {"food": [_lot(100)]})
+    ngo.is_busy = True
+    db.commit()
+
+    assert reserve_inventory(db, [(ngo, area, [_food(10)])]) == []
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+import pytest
+
+from geo import haversine_km
+from routing import RouteGraph
+
+def _area(area_id, latitude, longitude, waypoints):
+    return SimpleNamespace(
+        id=area_id, latitude=latitude, longitude=longitude,
+        nearest_supply_routes=[{"latitude": lat, "longitude": lon} for lat, lon in waypoints]
+    )
+
+def _leg(*points):
+    return sum(haversine_km(*a, *b) for a, b in zip(points, points[1:]))
+
+# Hubs: west (0, 0), middle (0, 1), east (0, 2), island (10, 10).
+# "east" and "north" share the middle hub; "island" is its own network.
+WEST, MIDDLE, EAST, ISLAND = (0.0, 0.0), (0.0, 1.0), (0.0, 2.0), (10.0, 10.0)
+AREAS = [
+    _area("east", 0.0, 3.0, [WEST, MIDDLE, EAST]),
+    _area("north", 1.0, 1.0, [MIDDLE]),
+    _area("island", 10.5, 10.5, [ISLAND]),
+    _area("unrouted", 0.0, 0.5, []),
+]
+
+def _hub(graph, point):
+    return list(zip(graph.hub_latitudes, graph.hub_longitudes)).index(point)
+
+def test_graph_joins_routes_at_shared_hubs():
+    graph = RouteGraph(AREAS)
+    assert graph.n_hubs == 4
+    assert graph.area_ids == ["east", "north", "island"]
+
+def test_travel_costs_are_shortest_paths():
+    graph = RouteGraph(AREAS)
+    # Reaching the middle hub directly is dearer than driving via the west hub
+    access = [(_hub(graph, WEST), 5.0), (_hub(graph, MIDDLE), 500.0)]
+    costs = graph.travel_costs(access, 10_000.0)
+
+    assert set(costs) == {"east", "north"}  # The island and the unrouted area are unreachable
+    assert costs["east"] == pytest.approx(5.0 + _leg(WEST, MIDDLE, EAST, (0.0, 3.0)))
+    assert costs["north"] == pytest.approx(5.0 + _leg(WEST, MIDDLE, (1.0, 1.0)))
+
+def test_cheaper_access_hub_wins():
+    graph = RouteGraph(AREAS)
+    access = [(_hub(graph, WEST), 5.0), (_hub(graph, MIDDLE), 1.0)]
+    costs = graph.travel_costs(access, 10_000.0)
+    assert costs["north"] == pytest.approx(1.0 + _leg(MIDDLE, (1.0, 1.0)))
+    assert costs["east"] == pytest.approx(1.0 + _leg(MIDDLE, EAST, (0.0, 3.0)))
+
+def test_travel_costs_stop_at_the_limit():
+    graph = RouteGraph(AREAS)
+    access = [(_hub(graph, WEST), 5.0)]
+    limit = 5.0 + _leg(WEST, MIDDLE, (1.0, 1.0))
+    assert set(graph.travel_costs(access, limit)) == {"north"}
+    assert graph.travel_costs(access, 50.0) == {}
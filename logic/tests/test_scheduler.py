@@ -0,0 +1,49 @@
+from datetime import datetime, UTC
+import asyncio
+import threading
+
+from algorithm import AidMatchingAlgorithm
+from scheduler import MatchPlan, MatchScheduler
+
+DEBOUNCE = 0.2
+
+def _counting_scheduler():
+    scheduler = MatchScheduler(
+        AidMatchingAlgorithm(), session_factory=None, debounce_seconds=DEBOUNCE, interval_seconds=3600.0
+    )
+    runs = []
+
+    def compute(strategy):
+        runs.append(strategy)
+        return MatchPlan(version=len(runs), strategy=strategy, computed_at=datetime.now(UTC), matches=[])
+
+    scheduler._compute = compute
+    return scheduler, runs
+
+def test_triggers_within_the_debounce_window_collapse_into_one_run():
+    async def scenario():
+        scheduler, runs = _counting_scheduler()
+        scheduler.start()
+        await asyncio.sleep(DEBOUNCE * 2)
+        assert len(runs) == 1  # The run at startup
+
+        # A burst of updates, some committed from a worker thread
+        for _ in range(5):
+            scheduler.trigger()
+            await asyncio.sleep(DEBOUNCE / 20)
+        threads = [threading.Thread(target=scheduler.trigger) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        await asyncio.sleep(DEBOUNCE * 3)
+        assert len(runs) == 2
+        assert not scheduler.pending
+
+        # A later update gets a run of its own
+        scheduler.trigger()
+        await asyncio.sleep(DEBOUNCE * 3)
+        assert len(runs) == 3
+        await scheduler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import numpy as np
+
+from snapshot import Snapshot
+from features import NGOFeatures, AreaFeatures
+from benchmarks.synthetic import generate_instance
+
+def test_features_follow_the_rows_being_allocated():
+    ngos, crisis_areas = generate_instance(10, 30, seed=0)
+    snapshot = Snapshot()
+    snapshot.rebuild(ngos, crisis_areas)
+    version = snapshot.version
+
+    # Rows already in the snapshot leave it untouched
+    _, _, changed_ngos, changed_areas = snapshot.features(ngos, crisis_areas)
+    assert changed_ngos == [] and changed_areas == []
+    assert snapshot.version == version
+
+    # Another worker process changed these rows; this snapshot never saw the writes
+    ngos[3].inventory = {"water": [{"category": "water", "quantity": 7, "unit": "liters"}]}
+    ngos[3].specializations = ["water"]
+    crisis_areas[5].current_needs = {"food": 123}
+    crisis_areas[5].urgency_levels = {"food": 5}
+    previous_location = (crisis_areas[5].latitude, crisis_areas[5].longitude)
+    crisis_areas[5].latitude += 1.0
+    ngo_features, area_features, changed_ngos, changed_areas = snapshot.features(ngos, crisis_areas)
+    assert changed_ngos == [ngos[3].id]
+    assert changed_areas == [crisis_areas[5].id]
+
+    expected_ngos = NGOFeatures.from_ngos(ngos)
+    expected_areas = AreaFeatures.from_crisis_areas(crisis_areas)
+    assert np.array_equal(ngo_features.available, expected_ngos.available)
+    assert np.array_equal(ngo_features.specialization, expected_ngos.specialization)
+    assert np.array_equal(area_features.need, expected_areas.need)
+    assert np.allclose(area_features.urgency, expected_areas.urgency)
+    assert snapshot.version == version + 1
+    # The heatmap reads the synced rows too, and drops what covers both locations
+    assert snapshot.areas["latitude"][snapshot.areas.positions[crisis_areas[5].id]] == crisis_areas[5].latitude
+    assert snapshot.take_synced_area_locations() == {
+        previous_location, (crisis_areas[5].latitude, crisis_areas[5].longitude)
+    }
+    assert snapshot.take_synced_area_locations() == set()
+
+def test_features_append_rows_the_snapshot_does_not_know():
+    ngos, crisis_areas = generate_instance(10, 30, seed=1)
+    snapshot = Snapshot()
+    snapshot.rebuild(ngos[:5], crisis_areas[:10])
+
+    ngo_features, area_features, changed_ngos, changed_areas = snapshot.features(ngos, crisis_areas)
+    assert changed_ngos == [ngo.id for ngo in ngos[5:]]
+    assert changed_areas == [area.id for area in crisis_areas[10:]]
+    assert len(snapshot.ngos) == len(ngos) and len(snapshot.areas) == len(crisis_areas)
+    assert np.array_equal(ngo_features.available, NGOFeatures.from_ngos(ngos).available)
+    assert np.array_equal(area_features.need, AreaFeatures.from_crisis_areas(crisis_areas).need)
+    assert snapshot.take_synced_area_locations() == {(area.latitude, area.longitude) for area in crisis_areas[10:]}
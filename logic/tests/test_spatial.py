@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from geo import haversine_matrix
+from spatial import SpatialIndex
+
+def _cluster(rng, size: int, latitude: float, longitude: float, spread: float):
+    latitudes = np.clip(rng.normal(latitude, spread, size), -90, 90)
+    longitudes = (rng.normal(longitude, spread, size) + 180) % 360 - 180
+    return latitudes, longitudes
+
+def _points(seed: int):
+    """Points around the poles, both sides of the antimeridian and the equator."""
+    rng = np.random.default_rng(seed)
+    clusters = [
+        _cluster(rng, 60, 89.5, 0.0, 1.0),
+        _cluster(rng, 60, -89.0, 120.0, 1.5),
+        _cluster(rng, 80, 10.0, 179.8, 0.5),
+        _cluster(rng, 80, -35.0, -179.9, 0.5),
+        _cluster(rng, 60, 0.0, 0.0, 2.0)
+    ]
+    return np.concatenate([c[0] for c in clusters]), np.concatenate([c[1] for c in clusters])
+
+def _brute_force(latitudes, longitudes, radii, query_latitudes, query_longitudes):
+    distances = haversine_matrix(latitudes, longitudes, query_latitudes, query_longitudes)
+    points, queries = np.nonzero(distances <= radii[:, None])
+    order = np.lexsort((points, queries))
+    return points[order], queries[order], distances[points[order], queries[order]]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_query_pairs_matches_brute_force(seed):
+    latitudes, longitudes = _points(seed)
+    query_latitudes, query_longitudes = _points(seed + 100)
+    # Radii spread over several power-of-two bands, including ones wider than a cluster
+    radii = np.random.default_rng(seed).choice([0.5, 5.0, 40.0, 150.0, 600.0, 2500.0], latitudes.size)
+
+    index = SpatialIndex(latitudes, longitudes, radii)
+    points, queries, distances = index.query_pairs(query_latitudes, query_longitudes)
+    expected_points, expected_queries, expected_distances = _brute_force(
+        latitudes, longitudes, radii, query_latitudes, query_longitudes
+    )
+    assert points.tolist() == expected_points.tolist()
+    assert queries.tolist() == expected_queries.tolist()
+    assert np.allclose(distances, expected_distances, rtol=0, atol=1e-9)
+
+def test_pairs_across_the_antimeridian_and_the_pole():
+    index = SpatialIndex([0.0, 89.9, 45.0], [179.95, 0.0, 10.0], [20.0, 50.0, -1.0])
+    points, distances = index.query(0.0, -179.95)
+    assert points.tolist() == [0]  # 11 km away across the antimeridian
+    assert distances[0] < 12
+    points, _ = index.query(89.9, 180.0)
+    assert points.tolist() == [1]  # 22 km away over the pole
+
+def test_negative_radius_reaches_nothing():
+    index = SpatialIndex([10.0], [10.0], [-1.0])
+    points, _ = index.query(10.0, 10.0)
+    assert points.size == 0
@@ -0,0 +1,55 @@
+import json
+from sqlalchemy.orm import sessionmaker
+
+import api
+from models.database import NGO, CrisisArea, Donation
+from models.types import Supply, SupplyCategory, ReachabilityLevel, SecurityLevel
+from snapshot import Snapshot
+
+def _setup(db, n_areas: int):
+    ngo = NGO(
+        id="ngo", name="ngo", is_busy=False, working_hours={}, latitude=0.0, longitude=0.0, reach_radius_km=100.0,
+        inventory={"food": [{"category": "food", "quantity": 1000, "unit": "kg", "expiry_date": None}]},
+        replenishment_time_hours={}, specializations=[]
+    )
+    areas = [
+        CrisisArea(
+            id=f"area{i}", name=f"area{i}", latitude=0.1, longitude=0.1, current_needs={"food": 10},
+            reachability=ReachabilityLevel.EASY, weather_conditions="clear", urgency_levels={"food": 3},
+            population=1000, current_inventory={}, road_conditions="good", security_level=SecurityLevel.SAFE,
+            nearest_supply_routes=[]
+        )
+        for i in range(n_areas)
+    ]
+    db.add_all([ngo, *areas])
+    db.commit()
+    return [(ngo, area, [Supply(category=SupplyCategory.FOOD, quantity=10, unit="kg")]) for area in areas]
+
+def test_stream_commits_in_batches_and_emits_one_line_per_match(db, monkeypatch):
+    matches = _setup(db, 7)
+    batches = []
+
+    def commit_matches(session, batch):
+        batches.append(len(batch))
+        return original(session, batch)
+
+    original = api.commit_matches
+    monkeypatch.setattr(api, "commit_matches", commit_matches)
+    monkeypatch.setattr(api, "BATCH_SIZE", 3)
+    monkeypatch.setattr(api, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind()))
+    monkeypatch.setattr(api, "snapshot", Snapshot())
+
+    lines = api.stream_matches(matches)
+    first = json.loads(next(lines))
+    # The first batch is committed before its lines are sent, the rest not yet
+    assert batches == [3]
+    assert db.query(Donation).count() == 3
+    records = [first] + [json.loads(line) for line in lines]
+
+    assert batches == [3, 3, 1]
+    assert [record["crisis_area"] for record in records] == [area.name for _, area, _ in matches]
+    # One donation per line
+    assert {record["donation_id"] for record in records} == {donation.id for donation in db.query(Donation).all()}
+    assert db.query(Donation).count() == len(matches)
+    db.expire_all()
+    assert db.get(NGO, "ngo").inventory["food"][0]["quantity"] == 1000 - 10 * len(matches)
@@ -0,0 +1,31 @@
+from tiles import HeatmapTileCache, tile_range
+
+def test_tile_range_wraps_around_the_antimeridian():
+    columns, rows = tile_range(3, -1.0, 170.0, 1.0, 190.0)
+    assert columns == [7, 0]
+    assert list(rows) == [3, 4]
+    columns, _ = tile_range(3, -1.0, -190.0, 1.0, -170.0)
+    assert columns == [7, 0]
+    columns, _ = tile_range(2, -1.0, -100.0, 1.0, 300.0)
+    assert columns == [0, 1, 2, 3]
+
+def test_invalidate_near_the_seam_drops_tiles_on_both_sides():
+    cache = HeatmapTileCache(16, 200.0)
+    for x in (0, 3, 7):
+        cache.set(3, x, 4, None, {"x": x}, cache.generation)
+
+    assert cache.invalidate(0.5, 179.9) == 2
+    assert cache.get(3, 0, 4) is None
+    assert cache.get(3, 7, 4) is None
+    assert cache.get(3, 3, 4) == {"x": 3}
+
+    cache.set(3, 7, 4, None, {"x": 7}, cache.generation)
+    assert cache.invalidate(0.5, -179.9) == 1
+    assert cache.get(3, 7, 4) is None
+
+def test_invalidate_near_a_pole_drops_every_column():
+    cache = HeatmapTileCache(16, 500.0)
+    for x in range(4):
+        cache.set(2, x, 0, None, {"x": x}, cache.generation)
+    assert cache.invalidate(89.0, 10.0) == 4
+    assert len(cache) == 0
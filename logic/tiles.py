@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional, Set, Tuple
+import math
+
+from cache import LRUCache
+from geo import reach_deg
+from models.types import SupplyCategory
+
+# Web Mercator tiles stop short of the poles
+MAX_LATITUDE = 85.0511287798
+
+TileKey = Tuple[int, int, int, Optional[str]]  # z, x, y, category
+
+def tile_latitude(z: int, y: float) -> float:
+    """Latitude of a (fractional) tile row edge, counted from the north at zoom z."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << z)))))
+
+def tile_range(z: int, south: float, west: float, north: float, east: float) -> Tuple[List[int], range]:
+    """Columns and rows of the zoom z tiles overlapping a latitude/longitude box.
+
+    Longitudes may run past ±180; columns wrap around the antimeridian.
+    """
+    n = 1 << z
+
+    def column(longitude: float) -> int:
+        return math.floor((longitude + 180) / 360 * n)
+
+    def row(latitude: float) -> int:
+        phi = math.radians(min(MAX_LATITUDE, max(-MAX_LATITUDE, latitude)))
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(phi)) / math.pi) / 2 * n)))
+
+    first, last = column(west), column(east)
+    columns = list(range(n)) if last - first + 1 >= n else [c % n for c in range(first, last + 1)]
+    return columns, range(row(north), row(south) + 1)
+
+class HeatmapTileCache:
+    """Heatmap tiles by slippy-map coordinates and category, dropped where crisis areas change.
+
+    A tile depends only on the crisis areas within radius_km of its cells, so a
+    change at one location invalidates just the tiles around it at each cached
+    zoom level.
+    """
+
+    def __init__(self, max_size: int, radius_km: float):
+        self.radius_km = radius_km
+        self._tiles = LRUCache(max_size, on_evict=self._forget)
+        self._by_zoom: Dict[int, Set[TileKey]] = {}
+        self.generation = 0  # Bumped on every invalidation
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    @staticmethod
+    def _key(z: int, x: int, y: int, category: Optional[SupplyCategory]) -> TileKey:
+        return (z, x, y, category.value if category else None)
+
+    def _forget(self, key: TileKey):
+        keys = self._by_zoom.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_zoom[key[0]]
+
+    def get(self, z: int, x: int, y: int, category: Optional[SupplyCategory] = None) -> Optional[Dict]:
+        return self._tiles.get(self._key(z, x, y, category))
+
+    def set(self, z: int, x: int, y: int, category: Optional[SupplyCategory], tile: Dict, generation: int):
+        """Store a tile computed while the cache was at `generation`.
+
+        Tiles that overlapped an invalidation since then may be stale and are
+        not stored.
+        """
+        if generation != self.generation:
+            return
+        key = self._key(z, x, y, category)
+        self._tiles.set(key, tile)
+        self._by_zoom.setdefault(z, set()).add(key)
+
+    def invalidate(self, latitude: float, longitude: float) -> int:
+        """Drop every cached tile a crisis area at this location contributes to; returns how many."""
+        self.generation += 1
+        lat_reach, lon_reach = (float(reach) for reach in reach_deg(latitude, self.radius_km))
+        stale = []
+        for z, keys in self._by_zoom.items():
+            columns, rows = tile_range(
+                z,
+                latitude - lat_reach, longitude - lon_reach,
+                latitude + lat_reach, longitude + lon_reach
+            )
+            columns = set(columns)
+            stale.extend(key for key in keys if key[1] in columns and key[2] in rows)
+        for key in stale:
+            self._tiles.pop(key)
+        return len(stale)
+
+    def clear(self):
+        self.generation += 1
+        self._tiles.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return self._tiles.stats()
@@ -46,6 +46,7 @@ function BoundsUpdater({ onBoundsChange }) {
           lat: bounds.getNorth(),
           lng: bounds.getEast(),
         },
+        zoom: map.getZoom(),
       });
     };
 
@@ -156,6 +157,37 @@ function WebSocketConnection({ onUpdate }) {
   return null;
 }
 
+// Heatmap tiles use the same z/x/y grid as the base map
+const MAX_TILE_ZOOM = 20;
+const MAX_LATITUDE = 85.0511287798;
+
+function tileRange(bounds) {
+  const z = Math.min(Math.max(Math.round(bounds.zoom), 0), MAX_TILE_ZOOM);
+  const n = 2 ** z;
+  const clamp = (value) => Math.min(n - 1, Math.max(0, Math.floor(value)));
+  // Columns are left unwrapped here; the view may cross the antimeridian
+  const column = (lng) => Math.floor(((lng + 180) / 360) * n);
+  const row = (lat) => {
+    const phi =
+      (Math.min(MAX_LATITUDE, Math.max(-MAX_LATITUDE, lat)) * Math.PI) / 180;
+    return clamp(((1 - Math.asinh(Math.tan(phi)) / Math.PI) / 2) * n);
+  };
+
+  const west = column(bounds.sw.lng);
+  let east = column(bounds.ne.lng);
+  if (east < west) east += n; // sw.lng > ne.lng: the view wraps past 180
+  east = Math.min(east, west + n - 1); // Each column at most once
+
+  const tiles = [];
+  for (let unwrapped = west; unwrapped <= east; unwrapped++) {
+    const x = ((unwrapped % n) + n) % n;
+    for (let y = row(bounds.ne.lat); y <= row(bounds.sw.lat); y++) {
+      tiles.push({ z, x, y });
+    }
+  }
+  return tiles;
+}
+
 function HeatmapUpdater({ bounds, selectedCategory, onDataUpdate }) {
   const [error, setError] = useState(null);
 
@@ -164,34 +196,36 @@ function HeatmapUpdater({ bounds, selectedCategory, onDataUpdate }) {
 
     const controller = new AbortController();
 
-    const fetchHeatmapData = async () => {
-      try {
-        setError(null);
-        const params = new URLSearchParams({
-          sw_lat: bounds.sw.lat.toFixed(6),
-          sw_lng: bounds.sw.lng.toFixed(6),
-          ne_lat: bounds.ne.lat.toFixed(6),
-          ne_lng: bounds.ne.lng.toFixed(6),
-        });
+    const fetchTile = async ({ z, x, y }) => {
+      const params = new URLSearchParams();
+      if (selectedCategory) {
+        params.append("category", selectedCategory);
+      }
 
-        if (selectedCategory) {
-          params.append("category", selectedCategory);
+      const response = await AuthService.fetchWithAuth(
+        `/api/heatmap/tiles/${z}/${x}/${y}?${params}`,
+        {
+          signal: controller.signal,
         }
+      );
 
-        const response = await AuthService.fetchWithAuth(
-          `/api/heatmap?${params}`,
-          {
-            signal: controller.signal,
-          }
-        );
+      if (!response.ok) {
+        const text = await response.text();
+        throw new Error(text || "Failed to fetch heatmap data");
+      }
 
-        if (!response.ok) {
-          const text = await response.text();
-          throw new Error(text || "Failed to fetch heatmap data");
-        }
+      return response.json();
+    };
 
-        const data = await response.json();
-        onDataUpdate(data);
+    const fetchHeatmapData = async () => {
+      try {
+        setError(null);
+        // Tiles are cached by the server, so panning mostly refetches cached ones
+        const tiles = await Promise.all(tileRange(bounds).map(fetchTile));
+        onDataUpdate({
+          points: tiles.flatMap((tile) => tile.points),
+          gradient: tiles.length > 0 ? tiles[0].gradient : {},
+        });
       } catch (err) {
         if (err.name === "AbortError") return;
         console.error("Error fetching heatmap data:", err);